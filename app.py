@@ -1,44 +1,173 @@
+import arranque
 from shiny import render
 from shiny.express import input, ui
-from shiny.ui import page_navbar
-from shiny import reactive
+from shiny.ui import page_navbar, output_data_frame
+from shiny import reactive, req
+from shiny.session import get_current_session
 
 from functools import partial
 from datetime import datetime
-from matplotlib.gridspec import GridSpec
 
 import pandas as pd
-import seaborn as sbn
-import matplotlib.pyplot as plt
 import numpy as np
 
-meses = ['Ene.', 'Feb.', 'Mar.', 'Abr.', 'May.', 'Jun.', 'Jul.', 'Ago.', 'Sep.', 'Oct.', 'Nov.', 'Dic.']
-RUOA = pd.read_csv("./data/R-U-O-A_completo.csv",index_col=0, parse_dates=True)
-To = RUOA.Temp_Avg.groupby(by=[RUOA.index.strftime("%m"),RUOA.index.strftime("%H:%M")]).mean().unstack().T.copy()
-T_confort = (0.31 * To.mean() + 17.8)
+from estaciones import disponibles, cargada, seleccion, versiones, calculado, DERIVADOS
+from clasificacion import HR_MIN, HR_MAX, fraccion_mensual, fraccion_diaria
+from viento import ETIQUETAS_SECTOR, ETIQUETAS_VELOCIDAD, filtrar, frecuencias
+from psicrometria import ETIQUETAS as ETIQUETAS_PSICRO
+from cuantiles import ESTADISTICOS
+from climatologia import tabla_mes
+from graficas import meses, ticks, grafica_heatmap, grafica_zona_confort, grafica_rosa_vientos
+from trabajadores import TareaGrafica
+from reactivo import rebote, limitar
+from salidas import imagen_png, heatmap_cliente, matrices_cliente
+import metricas
+from metricas import medido
+import diagnostico
+import vistas
+from vistas import HEATMAPS
+import calidad as control_calidad
+import exportar
+import ingesta
+
+ESTACIONES = disponibles()
+# Las estaciones se preparan en segundo plano para que el puerto se abra de inmediato
+arranque.iniciar()
+ingesta.iniciar()
+# Los rangos iniciales de los sliders se toman de la estación por defecto si está lista a
+# tiempo; si no, se usan rangos genéricos que ajustar_anios y ajustar_rangos corrigen al llegar
+inicial = arranque.inicial(next(iter(ESTACIONES)))
+if inicial is None:
+    inicial = {
+        "anios": (datetime.now().year - 1, datetime.now().year),
+        "To": pd.DataFrame([[0, 45]]),
+        "HR": pd.DataFrame([[0, 100]]),
+    }
+
+
+@reactive.poll(versiones, 1)
+def versiones_estaciones():
+    # Cambia cuando la ingesta recarga alguna estación; leer los contadores no cuesta nada
+    return versiones()
+
+
+# Versión de la estación elegida: un reactive.value sólo avisa cuando cambia su valor, así que
+# la recarga de otra estación no invalida datos() en esta sesión
+version = reactive.value(0)
+
+
+@reactive.effect
+def vigilar_version():
+    version.set(versiones_estaciones().get(input.lugar(), 0))
+
+
+@reactive.calc
+def datos():
+    version()
+    d = cargada(input.lugar())
+    if d is None:
+        # Mientras la estación se prepara en segundo plano las salidas esperan sin bloquear
+        # a las demás sesiones
+        arranque.pedir(input.lugar())
+        reactive.invalidate_later(0.2)
+        req(False)
+    arranque.primera_respuesta()
+    return d
+
+
+def derivado(nombre):
+    # Ventilación, viento, percentiles o calidad de la estación elegida. Se calculan en segundo plano
+    # (arranque.pedir): mientras no están, la salida espera sin detener el ciclo de eventos
+    d = datos()
+    if not calculado(d, nombre):
+        arranque.pedir(d["ruta"])
+        reactive.invalidate_later(0.2)
+        req(False)
+    return DERIVADOS[nombre](d)
+
+
+anios = rebote(input.anios)
+
+
+@reactive.calc
+def periodo():
+    # Climatologías de los años elegidos (todos por defecto)
+    return seleccion(datos(), anios())
+
+
+def tablas_estadistico(variable, estadistico):
+    # Medias del rango de años elegido o percentiles (de todos los años) de la variable, con los
+    # días por mes del mismo periodo para recortar el cubo
+    if estadistico == "media":
+        prefijo = "To" if variable == "Temp_Avg" else "HR"
+        return {"mensual": periodo()[prefijo], "diaria": periodo()[f"{prefijo}_diario"], "cubo": periodo()[f"{prefijo}_cubo"],
+                "dias_mes": periodo()["dias_mes"]}
+    return {**derivado("percentiles")[(variable, estadistico)], "dias_mes": datos()["dias_mes"]}
+
+
+@reactive.effect
+@medido
+async def enviar_matrices():
+    # Modo interactivo: el navegador recibe las matrices de la estación una sola vez
+    # (y otra vez si se cambia el estadístico de alguna de las variables)
+    req(input.modo_graficas() == "cliente")
+    estadisticos = (input.estadistico_To(), input.estadistico_HR())
+    To = tablas_estadistico("Temp_Avg", estadisticos[0])
+    HR = tablas_estadistico("RH_Avg", estadisticos[1])
+    matrices = {"To": To["mensual"], "To_diario": To["diaria"], "HR": HR["mensual"], "HR_diario": HR["diaria"]}
+    await get_current_session().send_custom_message("ecovent_matrices", matrices_cliente(periodo(), meses, estadisticos, matrices))
+
+
+@reactive.calc
+def rango_To():
+    To = periodo()["To"].stack()
+    return To.min(), To.max()
 
-Zona_confort = pd.DataFrame()
-Zona_confort['T_confort'] = T_confort
-Zona_confort['T_exterior'] = To.mean()
-Zona_confort['Lim_sup'] = T_confort + 2.5
-Zona_confort['Lim_inf'] = T_confort - 2.5
 
-To_diario = RUOA.Temp_Avg.groupby(by=[
-    RUOA.index.strftime("%m-%d"),  # Día completo
-    RUOA.index.strftime("%H:%M")     # Hora y minuto
-]).mean().unstack().T.copy()
+@reactive.calc
+def rango_HR():
+    HR = periodo()["HR"].stack()
+    return HR.min(), HR.max()
 
-HR = RUOA.RH_Avg.groupby(by=[RUOA.index.strftime("%m"),RUOA.index.strftime("%H:%M")]).mean().unstack().T.copy()
-HR_diario = RUOA.RH_Avg.groupby(by=[
-    RUOA.index.strftime("%m-%d"),  # Día completo
-    RUOA.index.strftime("%H:%M")     # Hora y minuto
-]).mean().unstack().T.copy()
+
+@reactive.calc
+def rango_confort():
+    Zona_confort = periodo()["Zona_confort"]
+    return Zona_confort['Lim_inf'].min(), Zona_confort['Lim_sup'].max()
+
+
+# Estación cuyos datos ya están en memoria; no cambia con las recargas de la misma estación, así
+# que los sliders de cada usuario sólo se reinician cuando elige otra estación
+lugar_listo = reactive.value(None)
+
+
+@reactive.effect
+def marcar_lugar():
+    datos()
+    lugar_listo.set(input.lugar())
+
+
+@reactive.effect
+@reactive.event(lugar_listo)
+def ajustar_anios():
+    desde, hasta = datos()["anios"]
+    ui.update_slider("anios", min=desde, max=hasta, value=[desde, hasta])
+
+
+@reactive.effect
+@reactive.event(lugar_listo)
+def ajustar_rangos():
+    ui.update_slider("temperaturas", value=list(vistas.rango(periodo(), "Heatmap_anual")))
+    ui.update_slider("temperaturas_dia", value=list(vistas.rango(periodo(), "Heatmap_mensual")))
+    ui.update_slider("HR_rango_anio", value=list(vistas.rango(periodo(), "Heatmap_anual_HR")))
+    ui.update_slider("HR_rango_mes", value=list(vistas.rango(periodo(), "Heatmap_mensual_HR")))
 
 
 ui.page_opts(
     title="EcoVent.app",  
     page_fn=partial(page_navbar, id="page"),  
 )
+ui.head_content(ui.tags.script(src="heatmap_cliente.js"))
 
 with ui.nav_panel("Acerca de"):  
 
@@ -54,10 +183,44 @@ with ui.nav_panel("Acerca de"):
     ui.input_select(
         "lugar",
         "¿Qué lugar deseas analizar?",
+        ESTACIONES,
+    ), 
+    ui.input_slider(
+        "anios",
+        "¿Qué años deseas considerar?",
+        min=inicial["anios"][0],
+        max=inicial["anios"][1],
+        value=list(inicial["anios"]),
+        step=1,
+        sep="",
+    ), 
+    ui.input_select(
+        "modo_graficas",
+        "¿Cómo deseas ver los mapas de calor?",
         {
-            "./data/R-U-O-A_completo.csv": "Temixco, en un futuro tendrá más opciones :)",
+            "servidor": "Imágenes generadas en el servidor",
+            "cliente": "Interactivos en el navegador (sin esperar al servidor)",
         }
     ), 
+    ui.h3("Descargar datos")
+    '''Tablas de la estación y años elegidos (promedios por hora y mes, por hora y día, y zona de confort) para usarlas en otras
+    herramientas.'''
+    ui.input_select("tabla_exportar", "Tabla", {
+        "To": "Temperatura, promedios mensuales",
+        "To_diario": "Temperatura, promedios diarios",
+        "HR": "Humedad relativa, promedios mensuales",
+        "HR_diario": "Humedad relativa, promedios diarios",
+        "Zona_confort": "Zona de confort",
+    })
+    ui.input_select("formato_exportar", "Formato", exportar.disponibles())
+
+    @render.download(
+        label="Descargar",
+        filename=lambda: exportar.nombre_archivo(datos(), input.tabla_exportar(), periodo()["anios"], input.formato_exportar()),
+    )
+    def descargar_tabla():
+        yield exportar.exportar(datos(), input.tabla_exportar(), periodo()["anios"], formato=input.formato_exportar())[0]
+
     ui.h3("Glosario")
     ui.p('''Humedad relativa: Razón de fracción molar de vapor a la fracción molar de aire saturado.''')
     ui.p('''Temperatura de confort [°C]: La temperatura de confort es aquella temperatura operativa (considera temperatura del aire, temperatura media 
@@ -80,41 +243,24 @@ with ui.nav_panel("Temperatura exterior"):
     en la cual se consigue un voto de sensación térmica de cero (ni frío ni calor). Para esta app se utilizó el modelo ASHRAE 55 (2013) con un 
     porcentaje de aceptación del 90%; esto representa el área gris o zona de confort.''',  
 
-    @render.plot()  
+    grafica_zona = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_zona_confort():
+        Zona_confort = periodo()["Zona_confort"]
+        clave = vistas.clave(periodo(), "zona_confort")
+        grafica_zona.pedir(clave, grafica_zona_confort, Zona_confort)
+
+    @imagen_png(alt="zona_confort")
     def zona_confort():
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-
-        # Gráfica principal
-        ax.plot(Zona_confort['T_confort'], label='T_confort', color='blue')
-        ax.plot(Zona_confort['T_exterior'], label='T_exterior', color='green')
-        ax.fill_between(
-            Zona_confort.index,
-            Zona_confort['Lim_inf'],
-            Zona_confort['Lim_sup'],
-            color='gray',
-            alpha=0.3,
-            label='Zona de confort'
-        )
-
-        # Personalizar la gráfica
-        ax.set_title('Zona de confort con la norma ASHRAE 55 (2013)')
-        ax.set_xlabel('Mes')
-        ax.set_ylabel('Temperatura [°C]')
-        ax.set_xticks(ticks=range(len(meses)))
-        ax.set_xticklabels(meses)
-
-        # Personalizar el eje Y para intervalos de 0.5 grados
-        min_y = Zona_confort['Lim_inf'].min() - 1  # Margen inferior
-        max_y = Zona_confort['Lim_sup'].max() + 1  # Margen superior
-        ax.set_yticks(np.arange(np.floor(min_y), np.ceil(max_y) + 0.5, 0.5))
-
-        ax.legend()
-        ax.grid()
+        return grafica_zona.imagen()
     @render.text
+    @medido
     def TC_lim():
-        return f'''Límite inferior minimo anual = {round(Zona_confort['Lim_inf'].min(),2)}°C, 
-        Límite superior máximo anual = {round(Zona_confort['Lim_sup'].max(),2)}°C'''
+        Lim_inf, Lim_sup = rango_confort()
+        return f'''Límite inferior minimo anual = {round(Lim_inf,2)}°C, 
+        Límite superior máximo anual = {round(Lim_sup,2)}°C'''
     ui.h3(" ")    
     ui.h3("Temperatura promedios mensuales")
     ui.p('''La principal variable que determina si es conveniente utilizar la ventilación natural en un momento dado es la 
@@ -122,11 +268,13 @@ with ui.nav_panel("Temperatura exterior"):
     años con los que se cuentan, 8 en el caso de Temixco. Esta gráfica permite dar un vistazo a grandes rasgos del 
     comportamiento de la temperatura a lo largo del año. Para una mejor visualización, usted puede modificar las 
     siguientes características:''')
+    ui.input_select("estadistico_To", "¿Qué deseas graficar en los mapas de calor de temperatura? (los percentiles consideran todos los años)",
+                    ESTADISTICOS)
     with ui.layout_columns():  
         with ui.card():  
             ui.card_header("Tiempo")
-            ui.input_slider("horario_anio", "Horario [horas]", min=0, max=23, value=[0, 23])  
-            ui.input_slider("meses_anio", "Periodo [meses]", min=1, max=12, value=[0, 23])  
+            ui.input_slider("horario_anio", "Horario [horas]", min=0, max=23, value=list(vistas.HORAS))  
+            ui.input_slider("meses_anio", "Periodo [meses]", min=1, max=12, value=list(vistas.MESES))  
 
 
         with ui.card():  
@@ -151,79 +299,67 @@ with ui.nav_panel("Temperatura exterior"):
 
         with ui.card():  
             ui.card_header("Temperatura exterior")
-            ui.input_slider("temperaturas", "Rango de temperatura [°C]", min=0, max=45, value=[To.stack().min(), To.stack().max()],step=0.01)
+            ui.input_slider("temperaturas", "Rango de temperatura [°C]", min=0, max=45, value=list(vistas.rango(inicial, "Heatmap_anual")),
+                            step=HEATMAPS["Heatmap_anual"]["paso"])
             @render.text
+            @medido
             def Tmin_Tmax_anual():
-                return f"Tmin_anual = {round(To.stack().min(),2)}°C, Tmax_anual = {round(To.stack().max(),2)}°C"
-            ui.input_numeric("delta", "Delta de temperatura [°C]", 1, min=0.5, max=10)  
+                Tmin, Tmax = rango_To()
+                return f"Tmin_anual = {round(Tmin,2)}°C, Tmax_anual = {round(Tmax,2)}°C"
+            ui.input_numeric("delta", "Delta de temperatura [°C]", HEATMAPS["Heatmap_anual"]["delta"], min=0.5, max=10)  
     
-    @render.plot(alt="Heatmap_anual") 
-    # def operaciones_heatmap1():
-
-
-    def Heatmap_anual():  
-        matriz_anio = To
-        matriz_anio.columns = meses
-
-        desde_hora = input.horario_anio()[0]
-        hasta_hora = input.horario_anio()[1]
-
-        desde_mes = input.meses_anio()[0]
-        hasta_mes = input.meses_anio()[1]
+    horario_anio = rebote(input.horario_anio)
+    meses_anio = rebote(input.meses_anio)
+    temperaturas = limitar(input.temperaturas)
 
+    @reactive.calc
+    def limites_anual():
         if input.AjusteTo_Tc() == "Si":
-            desde = Zona_confort['Lim_inf'].iloc[input.meses_anio()[0]:input.meses_anio()[1]].min()
-            hasta = Zona_confort['Lim_sup'].iloc[input.meses_anio()[0]:input.meses_anio()[1]].max()
-        else:
-            desde = input.temperaturas()[0]
-            hasta = input.temperaturas()[1]
-
-        matriz_anio = To.iloc[desde_hora:hasta_hora+1, desde_mes-1:hasta_mes] 
-
-        delta = input.delta()
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        # Crear el heatmap sin barra de color
-        sbn.heatmap(matriz_anio, cmap="jet", vmin=desde, vmax=hasta, cbar=False)
-
-        # Mostrar el heatmap con imshow
-        p = ax.imshow(matriz_anio, aspect="auto", cmap="jet", vmin=desde, vmax=hasta)
-
-        # Crear la colorbar
-        cbar = fig.colorbar(p, label="To [°C]")
-
-        # Generar ticks intermedios con np.arange y agregar los límites inferior y superior
-        ticks_intermedios = np.arange(desde, hasta, delta)  # Valores intermedios
-        ticks_completos = np.concatenate(([desde], ticks_intermedios, [hasta]))  # Incluyendo límites
-
-        # Redondear los valores de la lista al primer decimal
-        ticks_completos = [round(val, 1) for val in ticks_completos]
-
-        # Establecer los ticks completos en la colorbar
-        cbar.set_ticks(ticks_completos)
-
-        # Etiquetar los ticks
-        cbar.set_ticklabels([f"{tick}" for tick in ticks_completos])
-
-        # Mostrar los límites inferiores y superiores en ambos extremos de la colorbar
-        cbar.ax.tick_params(which="both", direction="out", top=True, bottom=True)
-
-        # Personalizar los valores del eje Y para que estén horizontales
-        ax.tick_params(axis="y", labelrotation=0)  # Configuración para etiquetas horizontales
-
-        # Personalizar el título y los ejes
-        plt.title("Temperatura promedios mensuales", fontsize=12, fontweight="bold")
-        ax.set_ylabel("Tiempo [h]")
-        ax.set_xlabel("Mes")
-
-        return ax
+            Zona_confort = periodo()["Zona_confort"]
+            desde_mes, hasta_mes = meses_anio()
+            limites = (Zona_confort['Lim_inf'].iloc[desde_mes-1:hasta_mes].min(),
+                       Zona_confort['Lim_sup'].iloc[desde_mes-1:hasta_mes].max())
+            req(not np.isnan(limites).any())
+            return limites
+        return tuple(temperaturas())
+
+    @reactive.calc
+    def matriz_anio():
+        desde_hora, hasta_hora = horario_anio()
+        desde_mes, hasta_mes = meses_anio()
+        return tablas_estadistico("Temp_Avg", input.estadistico_To())["mensual"].set_axis(meses, axis=1).iloc[desde_hora:hasta_hora+1, desde_mes-1:hasta_mes]
+
+    @reactive.calc
+    def ticks_anual():
+        desde, hasta = limites_anual()
+        return ticks(desde, hasta, input.delta())
+
+    grafica_anual = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_Heatmap_anual():
+        req(input.modo_graficas() != "cliente")
+        desde, hasta = limites_anual()
+        clave = vistas.clave(periodo(), "Heatmap_anual", input.estadistico_To(), horario_anio(), meses_anio(), desde, hasta, ticks_anual())
+        grafica_anual.pedir(clave, grafica_heatmap, matriz_anio(), desde, hasta, ticks_anual(), HEATMAPS["Heatmap_anual"]["etiqueta"],
+                            vistas.titulo("Heatmap_anual", input.estadistico_To()), "Mes")
+
+    with ui.panel_conditional("input.modo_graficas === 'cliente'"):
+        heatmap_cliente("Heatmap_anual_cliente", "To", "horario_anio", "meses_anio", "temperaturas", "delta",
+                        "AjusteTo_Tc", "confort", HEATMAPS["Heatmap_anual"]["etiqueta"], HEATMAPS["Heatmap_anual"]["titulo"], "Mes")
+
+    with ui.panel_conditional("input.modo_graficas !== 'cliente'"):
+        @imagen_png(alt="Heatmap_anual")
+        def Heatmap_anual():
+            return grafica_anual.imagen()
     
     ui.h3("Temperatura promedios diarios")
     'Así mismo, estas temperaturas representan el promedio de cada hora para cada día para los años con los que se cuentan, la ventaja que tiene de los promedios mensuales es una mayor resolución de los datos, un uso más preciso de la temperatura de confort. Para una mejor visualización, usted puede modificar las siguientes características:'
     with ui.layout_columns(): 
         with ui.card():  
             ui.card_header("Tiempo")
-            ui.input_slider("horario_mes", "Horario [horas]", min=0, max=23, value=[0, 23])  
+            ui.input_slider("horario_mes", "Horario [horas]", min=0, max=23, value=list(vistas.HORAS))  
             ui.input_select(
                 "mes",
                 "¿Qué mes deseas analizar?",
@@ -240,9 +376,10 @@ with ui.nav_panel("Temperatura exterior"):
                     "10": "Octubre",
                     "11": "Noviembre",
                     "12": "Diciembre"
-                }
+                },
+                selected=vistas.MES,
             ), 
-            ui.input_slider("dias_mes", "Periodo (dias)", min=1, max=31, value=[0, 31])             
+            ui.input_slider("dias_mes", "Periodo (dias)", min=1, max=31, value=list(vistas.DIAS))             
 
 
 
@@ -270,77 +407,63 @@ with ui.nav_panel("Temperatura exterior"):
             ui.input_slider(
                 "temperaturas_dia", "Rango de temperatura [°C]", 
                 min=0, max=45, 
-                value=[round(To.stack().min(),2), 
-                    round(To.stack().max(),2)]
-                ,step=0.01)
+                value=list(vistas.rango(inicial, "Heatmap_mensual")),
+                step=HEATMAPS["Heatmap_mensual"]["paso"])
             
             @render.text
+            @medido
             def Tmin_Tmax_mensual():
-                return f'''Tmin_dia = {round(To_diario[[col for col in To_diario.columns if col.startswith(str(input.mes()))]].stack().min(),2)}°C, 
-                        Tmax_dia = {round(To_diario[[col for col in To_diario.columns if col.startswith(str(input.mes()))]].stack().max(),2)}°C"'''
+                Tmin, Tmax = periodo()["To_rango_mes"][int(input.mes())-1]
+                return f'''Tmin_dia = {round(Tmin,2)}°C, 
+                        Tmax_dia = {round(Tmax,2)}°C"'''
             
-            ui.input_numeric("delta_dia", "Delta de temperatura [°C]", 1, min=0.5, max=10)  
+            ui.input_numeric("delta_dia", "Delta de temperatura [°C]", HEATMAPS["Heatmap_mensual"]["delta"], min=0.5, max=10)  
     
-    @render.plot(alt="Heatmap_mensual") 
-    # def operaciones_heatmap1():
-
-
-    def Heatmap_mensual():  
-        matriz_mes = To_diario
-
-        desde_hora = input.horario_mes()[0]
-        hasta_hora = input.horario_mes()[1]
-
-        desde_dia = input.dias_mes()[0]
-        hasta_dia = input.dias_mes()[1]
-
+    horario_mes = rebote(input.horario_mes)
+    dias_mes = rebote(input.dias_mes)
+    temperaturas_dia = limitar(input.temperaturas_dia)
+
+    @reactive.calc
+    def limites_mensual():
+        # El rango de años elegido puede no cubrir el mes
+        req(tablas_estadistico("Temp_Avg", input.estadistico_To())["dias_mes"][int(input.mes())-1] > 0)
         if input.Ajuste_diario_To_Tc() == "Si":
-            desde = Zona_confort['Lim_inf'].iloc[int(input.mes())]
-            hasta = Zona_confort['Lim_sup'].iloc[int(input.mes())]
-        else:
-            desde = input.temperaturas_dia()[0]
-            hasta = input.temperaturas_dia()[1]
-
-        matriz_mes = matriz_mes[[col for col in To_diario.columns if col.startswith(str(input.mes()))]] 
-        matriz_mes = matriz_mes.iloc[desde_hora:hasta_hora+1, desde_dia-1:hasta_dia] 
-        
-        delta = input.delta_dia()
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        # Crear el heatmap sin barra de color
-        sbn.heatmap(matriz_mes, cmap="jet", vmin=desde, vmax=hasta, cbar=False)
-
-        # Mostrar el heatmap con imshow
-        p = ax.imshow(matriz_mes, aspect="auto", cmap="jet", vmin=desde, vmax=hasta)
-
-        # Crear la colorbar
-        cbar = fig.colorbar(p, label="To [°C]")
-
-        # Generar ticks intermedios con np.arange y agregar los límites inferior y superior
-        ticks_intermedios = np.arange(desde, hasta, delta)  # Valores intermedios
-        ticks_completos = np.concatenate(([desde], ticks_intermedios, [hasta]))  # Incluyendo límites
-
-        # Redondear los valores de la lista al primer decimal
-        ticks_completos = [round(val, 1) for val in ticks_completos]
-
-        # Establecer los ticks completos en la colorbar
-        cbar.set_ticks(ticks_completos)
-
-        # Etiquetar los ticks
-        cbar.set_ticklabels([f"{tick}" for tick in ticks_completos])
-
-        # Mostrar los límites inferiores y superiores en ambos extremos de la colorbar
-        cbar.ax.tick_params(which="both", direction="out", top=True, bottom=True)
-
-        # Personalizar los valores del eje Y para que estén horizontales
-        ax.tick_params(axis="y", labelrotation=0)  # Configuración para etiquetas horizontales
-
-        # Personalizar el título y los ejes
-        plt.title("Temperatura promedios diarios", fontsize=12, fontweight="bold")
-        ax.set_ylabel("Tiempo [h]")
-        ax.set_xlabel("Mes")
-
-        return ax
+            # Límites de confort de cada día (temperatura prevaleciente) para los días mostrados
+            Zona_confort = periodo()["Zona_confort_diaria"].loc[matriz_mes().columns]
+            return (Zona_confort['Lim_inf'].min(), Zona_confort['Lim_sup'].max())
+        return tuple(temperaturas_dia())
+
+    @reactive.calc
+    def matriz_mes():
+        tablas = tablas_estadistico("Temp_Avg", input.estadistico_To())
+        return tabla_mes(tablas["cubo"], tablas["dias_mes"], int(input.mes()), horario_mes(), dias_mes())
+
+    @reactive.calc
+    def ticks_mensual():
+        desde, hasta = limites_mensual()
+        return ticks(desde, hasta, input.delta_dia())
+
+    grafica_mensual = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_Heatmap_mensual():
+        req(input.modo_graficas() != "cliente")
+        desde, hasta = limites_mensual()
+        clave = vistas.clave(periodo(), "Heatmap_mensual", input.estadistico_To(), input.mes(), horario_mes(), dias_mes(), desde, hasta, ticks_mensual())
+        grafica_mensual.pedir(clave, grafica_heatmap, matriz_mes(), desde, hasta, ticks_mensual(), HEATMAPS["Heatmap_mensual"]["etiqueta"],
+                               vistas.titulo("Heatmap_mensual", input.estadistico_To()), "Mes")
+
+    with ui.panel_conditional("input.modo_graficas === 'cliente'"):
+        heatmap_cliente("Heatmap_mensual_cliente", "To_diario", "horario_mes", "dias_mes", "temperaturas_dia", "delta_dia",
+                        "Ajuste_diario_To_Tc", "confort", HEATMAPS["Heatmap_mensual"]["etiqueta"], HEATMAPS["Heatmap_mensual"]["titulo"], "Mes",
+                        mes="mes")
+
+    with ui.panel_conditional("input.modo_graficas !== 'cliente'"):
+        @imagen_png(alt="Heatmap_mensual")
+        def Heatmap_mensual():
+            limites_mensual()
+            return grafica_mensual.imagen()
     
     ui.h3("Conclusión")
     'En términos de temperatura, las horas en las que resulta conveniente la ventilación natural son aquellas que se encuentran entre los límites de la zona de confort, visibles al activar la opción de ajuste. Esto puede ayudar a tener condiciones confortables en las edificaciones y a ahorrar energía en aqullas que cuentan con sistemas de enfriamiento y/o calentamiento. Cabe destacar que estos modelos no toman en cuenta la temperatura del aire al interior, por lo tanto, en algunas ocasiones será conveniente aprovechar la ventilación natural, aunque la temperatura del aire exterior se encuentre fuera de la zona de confort.'
@@ -358,12 +481,14 @@ with ui.nav_panel("Humedad relativa"):
  
     ui.h3("HR promedios mensuales")
     'En esta gráfica se puede observar el comportamiento de la temperatura a lo largo del año. Para una mejor visualización, usted puede modificar las siguientes características:'
+    ui.input_select("estadistico_HR", "¿Qué deseas graficar en los mapas de calor de humedad? (los percentiles consideran todos los años)",
+                    ESTADISTICOS)
 
     with ui.layout_columns(): 
         with ui.card():  
             ui.card_header("Tiempo")
-            ui.input_slider("horario_anio_HR", "Horario [horas]", min=0, max=23, value=[0, 23])  
-            ui.input_slider("meses_anio_HR", "Periodo [meses]", min=1, max=12, value=[0, 23])  
+            ui.input_slider("horario_anio_HR", "Horario [horas]", min=0, max=23, value=list(vistas.HORAS))  
+            ui.input_slider("meses_anio_HR", "Periodo [meses]", min=1, max=12, value=list(vistas.MESES))  
 
         with ui.card():  
             ui.card_header("Ajuste a la norma")
@@ -387,79 +512,62 @@ with ui.nav_panel("Humedad relativa"):
 
         with ui.card():  
             ui.card_header("Humedad")
-            ui.input_slider("HR_rango_anio", "Rango de humedad relativa (%)", min=0, max=100, value=[HR.stack().min(), HR.stack().max()],step=0.5)
+            ui.input_slider("HR_rango_anio", "Rango de humedad relativa (%)", min=0, max=100, value=list(vistas.rango(inicial, "Heatmap_anual_HR")),
+                            step=HEATMAPS["Heatmap_anual_HR"]["paso"])
             @render.text
+            @medido
             def HRmin_HRmax_anual():
-                return f"HRmin_anual = {round(HR.stack().min(),2)}%, HRmax_anual = {round(HR.stack().max(),2)}%"
-            ui.input_numeric("delta_HR_anual", "Delta de HR (%)", 10, min=0.5, max=50)  
+                HRmin, HRmax = rango_HR()
+                return f"HRmin_anual = {round(HRmin,2)}%, HRmax_anual = {round(HRmax,2)}%"
+            ui.input_numeric("delta_HR_anual", "Delta de HR (%)", HEATMAPS["Heatmap_anual_HR"]["delta"], min=0.5, max=50)  
     
-    @render.plot(alt="Heatmap_anual") 
-    # def operaciones_heatmap1():
-
-
-    def Heatmap_anual_HR():  
-        matriz_anio = HR
-        matriz_anio.columns = meses
-
-        desde_hora = input.horario_anio_HR()[0]
-        hasta_hora = input.horario_anio_HR()[1]
-
-        desde_mes = input.meses_anio_HR()[0]
-        hasta_mes = input.meses_anio_HR()[1]
+    horario_anio_HR = rebote(input.horario_anio_HR)
+    meses_anio_HR = rebote(input.meses_anio_HR)
+    HR_rango_anio = limitar(input.HR_rango_anio)
 
+    @reactive.calc
+    def limites_anual_HR():
         if input.AjusteHR() == "Si":
-            desde = 20
-            hasta = 60
-        else:
-            desde = input.HR_rango_anio()[0]
-            hasta = input.HR_rango_anio()[1]
-
-        matriz_anio = HR.iloc[desde_hora:hasta_hora+1, desde_mes-1:hasta_mes] 
-
-        delta = input.delta_HR_anual()
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        # Crear el heatmap sin barra de color
-        sbn.heatmap(matriz_anio, cmap="jet", vmin=desde, vmax=hasta, cbar=False)
-
-        # Mostrar el heatmap con imshow
-        p = ax.imshow(matriz_anio, aspect="auto", cmap="jet", vmin=desde, vmax=hasta)
-
-        # Crear la colorbar
-        cbar = fig.colorbar(p, label="HR [%]")
-
-        # Generar ticks intermedios con np.arange y agregar los límites inferior y superior
-        ticks_intermedios = np.arange(desde, hasta, delta)  # Valores intermedios
-        ticks_completos = np.concatenate(([desde], ticks_intermedios, [hasta]))  # Incluyendo límites
-
-        # Redondear los valores de la lista al primer decimal
-        ticks_completos = [round(val, 1) for val in ticks_completos]
-
-        # Establecer los ticks completos en la colorbar
-        cbar.set_ticks(ticks_completos)
-
-        # Etiquetar los ticks
-        cbar.set_ticklabels([f"{tick}" for tick in ticks_completos])
-
-        # Mostrar los límites inferiores y superiores en ambos extremos de la colorbar
-        cbar.ax.tick_params(which="both", direction="out", top=True, bottom=True)
-
-        # Personalizar los valores del eje Y para que estén horizontales
-        ax.tick_params(axis="y", labelrotation=0)  # Configuración para etiquetas horizontales
-
-        # Personalizar el título y los ejes
-        plt.title("Humedad relativa promedios mensuales", fontsize=12, fontweight="bold")
-        ax.set_ylabel("Tiempo [h]")
-        ax.set_xlabel("Mes")
-
-        return ax
+            return (20, 60)
+        return tuple(HR_rango_anio())
+
+    @reactive.calc
+    def matriz_anio_HR():
+        desde_hora, hasta_hora = horario_anio_HR()
+        desde_mes, hasta_mes = meses_anio_HR()
+        return tablas_estadistico("RH_Avg", input.estadistico_HR())["mensual"].set_axis(meses, axis=1).iloc[desde_hora:hasta_hora+1, desde_mes-1:hasta_mes]
+
+    @reactive.calc
+    def ticks_anual_HR():
+        desde, hasta = limites_anual_HR()
+        return ticks(desde, hasta, input.delta_HR_anual())
+
+    grafica_anual_HR = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_Heatmap_anual_HR():
+        req(input.modo_graficas() != "cliente")
+        desde, hasta = limites_anual_HR()
+        clave = vistas.clave(periodo(), "Heatmap_anual_HR", input.estadistico_HR(), horario_anio_HR(), meses_anio_HR(), desde, hasta, ticks_anual_HR())
+        grafica_anual_HR.pedir(clave, grafica_heatmap, matriz_anio_HR(), desde, hasta, ticks_anual_HR(), HEATMAPS["Heatmap_anual_HR"]["etiqueta"],
+                                vistas.titulo("Heatmap_anual_HR", input.estadistico_HR()), "Mes")
+
+    with ui.panel_conditional("input.modo_graficas === 'cliente'"):
+        heatmap_cliente("Heatmap_anual_HR_cliente", "HR", "horario_anio_HR", "meses_anio_HR", "HR_rango_anio", "delta_HR_anual",
+                        "AjusteHR", "hr", HEATMAPS["Heatmap_anual_HR"]["etiqueta"], HEATMAPS["Heatmap_anual_HR"]["titulo"], "Mes")
+
+    with ui.panel_conditional("input.modo_graficas !== 'cliente'"):
+        @imagen_png(alt="Heatmap_anual")
+        def Heatmap_anual_HR():
+            return grafica_anual_HR.imagen()
     
     ui.h3("HR promedios diarios")
     'Así mismo, estos datos representan el promedio de cada hora para cada día para los años con los que se cuentan, la ventaja que tiene de los promedios mensuales es una mayor resolución. Para una mejor visualización, usted puede modificar las siguientes características:'
     with ui.layout_columns(): 
         with ui.card():  
             ui.card_header("Tiempo")
-            ui.input_slider("horario_mes_HR", "Horario [horas]", min=0, max=23, value=[0, 23])  
+            ui.input_slider("horario_mes_HR", "Horario [horas]", min=0, max=23, value=list(vistas.HORAS))  
             ui.input_select(
                 "mes_HR",
                 "¿Qué mes deseas analizar?",
@@ -476,9 +584,10 @@ with ui.nav_panel("Humedad relativa"):
                     "10": "Octubre",
                     "11": "Noviembre",
                     "12": "Diciembre"
-                }
+                },
+                selected=vistas.MES,
             ), 
-            ui.input_slider("dias_mes_HR", "Periodo (dias)", min=1, max=31, value=[0, 31])             
+            ui.input_slider("dias_mes_HR", "Periodo (dias)", min=1, max=31, value=list(vistas.DIAS))             
         with ui.card():  
             ui.card_header("Ajuste a la norma")
             ui.input_select(  
@@ -501,80 +610,303 @@ with ui.nav_panel("Humedad relativa"):
         with ui.card():  
             ui.card_header("Humedad")
             ui.input_slider("HR_rango_mes", "Rango de humedad relativa (%)", min=0, max=100, 
-                value=[round(HR.stack().min(),2), 
-                    round(HR.stack().max(),2)]
-                ,step=0.5)
+                value=list(vistas.rango(inicial, "Heatmap_mensual_HR")),
+                step=HEATMAPS["Heatmap_mensual_HR"]["paso"])
             
             @render.text
+            @medido
             def HR_dia_min_max():
-                return f'''HRmin_dia = {round(HR_diario[[col for col in HR_diario.columns if col.startswith(str(input.mes_HR()))]].stack().min(),2)}%, 
-                        HRmax_dia = {round(HR_diario[[col for col in HR_diario.columns if col.startswith(str(input.mes_HR()))]].stack().max(),2)}%"'''
+                HRmin, HRmax = periodo()["HR_rango_mes"][int(input.mes_HR())-1]
+                return f'''HRmin_dia = {round(HRmin,2)}%, 
+                        HRmax_dia = {round(HRmax,2)}%"'''
             
-            ui.input_numeric("delta_dia_HR", "Delta de humrdad relativa [%]", 20, min=0.5, max=50)  
+            ui.input_numeric("delta_dia_HR", "Delta de humrdad relativa [%]", HEATMAPS["Heatmap_mensual_HR"]["delta"], min=0.5, max=50)  
             
-    @render.plot(alt="Heatmap_mensual") 
-    # def operaciones_heatmap1():
-
-
-    def Heatmap_mensual_HR():  
-        matriz_mes = HR_diario
-
-        desde_hora = input.horario_mes_HR()[0]
-        hasta_hora = input.horario_mes_HR()[1]
-
-        desde_dia = input.dias_mes_HR()[0]
-        hasta_dia = input.dias_mes_HR()[1]
+    horario_mes_HR = rebote(input.horario_mes_HR)
+    dias_mes_HR = rebote(input.dias_mes_HR)
+    HR_rango_mes = limitar(input.HR_rango_mes)
 
+    @reactive.calc
+    def limites_mensual_HR():
+        req(tablas_estadistico("RH_Avg", input.estadistico_HR())["dias_mes"][int(input.mes_HR())-1] > 0)
         if input.AjusteHR_diario() == "Si":
-            desde = 20
-            hasta = 60
-        else:
-            desde = input.HR_rango_mes()[0]
-            hasta = input.HR_rango_mes()[1]
-
-        matriz_mes = matriz_mes[[col for col in HR_diario.columns if col.startswith(str(input.mes_HR()))]] 
-        matriz_mes = matriz_mes.iloc[desde_hora:hasta_hora+1, desde_dia-1:hasta_dia] 
-        
-        delta = input.delta_dia_HR()
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        # Crear el heatmap sin barra de color
-        sbn.heatmap(matriz_mes, cmap="jet", vmin=desde, vmax=hasta, cbar=False)
-
-        # Mostrar el heatmap con imshow
-        p = ax.imshow(matriz_mes, aspect="auto", cmap="jet", vmin=desde, vmax=hasta)
+            return (20, 60)
+        return tuple(HR_rango_mes())
+
+    @reactive.calc
+    def matriz_mes_HR():
+        tablas = tablas_estadistico("RH_Avg", input.estadistico_HR())
+        return tabla_mes(tablas["cubo"], tablas["dias_mes"], int(input.mes_HR()), horario_mes_HR(), dias_mes_HR())
+
+    @reactive.calc
+    def ticks_mensual_HR():
+        desde, hasta = limites_mensual_HR()
+        return ticks(desde, hasta, input.delta_dia_HR())
+
+    grafica_mensual_HR = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_Heatmap_mensual_HR():
+        req(input.modo_graficas() != "cliente")
+        desde, hasta = limites_mensual_HR()
+        clave = vistas.clave(periodo(), "Heatmap_mensual_HR", input.estadistico_HR(), input.mes_HR(), horario_mes_HR(), dias_mes_HR(), desde, hasta, ticks_mensual_HR())
+        grafica_mensual_HR.pedir(clave, grafica_heatmap, matriz_mes_HR(), desde, hasta, ticks_mensual_HR(), HEATMAPS["Heatmap_mensual_HR"]["etiqueta"],
+                                  vistas.titulo("Heatmap_mensual_HR", input.estadistico_HR()), "Mes")
+
+    with ui.panel_conditional("input.modo_graficas === 'cliente'"):
+        heatmap_cliente("Heatmap_mensual_HR_cliente", "HR_diario", "horario_mes_HR", "dias_mes_HR", "HR_rango_mes", "delta_dia_HR",
+                        "AjusteHR_diario", "hr", HEATMAPS["Heatmap_mensual_HR"]["etiqueta"], HEATMAPS["Heatmap_mensual_HR"]["titulo"], "Mes",
+                        mes="mes_HR")
+
+    with ui.panel_conditional("input.modo_graficas !== 'cliente'"):
+        @imagen_png(alt="Heatmap_mensual")
+        def Heatmap_mensual_HR():
+            limites_mensual_HR()
+            return grafica_mensual_HR.imagen()
+    
+    ui.h3("Conclusión")
+    '''En términos de humedad relavita, las horas en las que resulta conveniente la ventilación natural son aquellas que se 
+    encuentran entre los Límites de la norma ASHRAE 55 (2013), visibles al activar la opción de ajuste. Esto puede ayudar a 
+    mantener dentro de los límites la humedad del ambiente, con ello se puede reducir o evitar el uso de sistemas de control de
+    humedad.'''
 
-        # Crear la colorbar
-        cbar = fig.colorbar(p, label="To [%]")
+#///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
-        # Generar ticks intermedios con np.arange y agregar los límites inferior y superior
-        ticks_intermedios = np.arange(desde, hasta, delta)  # Valores intermedios
-        ticks_completos = np.concatenate(([desde], ticks_intermedios, [hasta]))  # Incluyendo límites
+with ui.nav_panel("Psicrometría"):
+    ui.h3("Propiedades psicrométricas")
+    '''La humedad relativa depende de la temperatura, por lo que por sí sola no dice cuánta agua hay en el aire. A partir de la 
+    temperatura y la humedad relativa de cada registro se calculan la temperatura de rocío, la razón de humedad, la entalpía y la 
+    temperatura de bulbo húmedo, que permiten saber si el aire exterior aporta o retira calor y humedad al entrar a un edificio.'''
+    with ui.layout_columns():
+        with ui.card():
+            ui.card_header("Propiedad")
+            ui.input_select("variable_psicro", "¿Qué propiedad deseas analizar?", ETIQUETAS_PSICRO)
 
-        # Redondear los valores de la lista al primer decimal
-        ticks_completos = [round(val, 1) for val in ticks_completos]
+            @render.text
+            @medido
+            def psicro_min_max():
+                desde, hasta = rango_psicro()
+                return f"Mínimo = {round(desde,2)}, Máximo = {round(hasta,2)}"
 
-        # Establecer los ticks completos en la colorbar
-        cbar.set_ticks(ticks_completos)
+        with ui.card():
+            ui.card_header("Tiempo")
+            ui.input_slider("horario_psicro", "Horario [horas]", min=0, max=23, value=[0, 23])
+            ui.input_slider("meses_psicro", "Periodo [meses]", min=1, max=12, value=[1, 12])
+
+    horario_psicro = rebote(input.horario_psicro)
+    meses_psicro = rebote(input.meses_psicro)
+
+    @reactive.calc
+    def rango_psicro():
+        # Misma escala de color para todos los recortes de la propiedad elegida
+        tabla = periodo()["psicrometria"][input.variable_psicro()].stack()
+        return tabla.min(), tabla.max()
+
+    ui.h3("Promedios mensuales")
+    grafica_psicro_anual = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_psicro_anual():
+        variable = input.variable_psicro()
+        desde, hasta = rango_psicro()
+        desde_hora, hasta_hora = horario_psicro()
+        desde_mes, hasta_mes = meses_psicro()
+        matriz = periodo()["psicrometria"][variable].set_axis(meses, axis=1).iloc[desde_hora:hasta_hora+1, desde_mes-1:hasta_mes]
+        clave = (datos()["ruta"], datos()["version"], periodo()["anios"], "psicro_anual", variable, horario_psicro(), meses_psicro())
+        grafica_psicro_anual.pedir(clave, grafica_heatmap, matriz, desde, hasta, ticks(desde, hasta, (hasta - desde) / 10),
+                                   ETIQUETAS_PSICRO[variable], f"{ETIQUETAS_PSICRO[variable]}, promedios mensuales", "Mes")
+
+    @imagen_png(alt="psicro_anual")
+    def psicro_anual():
+        return grafica_psicro_anual.imagen()
+
+    ui.h3("Promedios diarios")
+    with ui.layout_columns():
+        with ui.card():
+            ui.input_select(
+                "mes_psicro",
+                "¿Qué mes deseas analizar?",
+                {
+                    "01": "Enero",
+                    "02": "Febrero",
+                    "03": "Marzo",
+                    "04": "Abril",
+                    "05": "Mayo",
+                    "06": "Junio",
+                    "07": "Julio",
+                    "08": "Agosto",
+                    "09": "Septiembre",
+                    "10": "Octubre",
+                    "11": "Noviembre",
+                    "12": "Diciembre"
+                }
+            )
+        with ui.card():
+            ui.input_slider("dias_psicro", "Periodo (dias)", min=1, max=31, value=[1, 31])
+
+    dias_psicro = rebote(input.dias_psicro)
+    grafica_psicro_mensual = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_psicro_mensual():
+        req(periodo()["dias_mes"][int(input.mes_psicro())-1] > 0)
+        variable = input.variable_psicro()
+        desde, hasta = rango_psicro()
+        matriz = tabla_mes(periodo()["psicrometria_cubo"][variable], periodo()["dias_mes"], int(input.mes_psicro()),
+                           horario_psicro(), dias_psicro())
+        clave = (datos()["ruta"], datos()["version"], periodo()["anios"], "psicro_mensual", variable, input.mes_psicro(),
+                 horario_psicro(), dias_psicro())
+        grafica_psicro_mensual.pedir(clave, grafica_heatmap, matriz, desde, hasta, ticks(desde, hasta, (hasta - desde) / 10),
+                                     ETIQUETAS_PSICRO[variable], f"{ETIQUETAS_PSICRO[variable]}, promedios diarios", "Mes")
+
+    @imagen_png(alt="psicro_mensual")
+    def psicro_mensual():
+        req(periodo()["dias_mes"][int(input.mes_psicro())-1] > 0)
+        return grafica_psicro_mensual.imagen()
 
-        # Etiquetar los ticks
-        cbar.set_ticklabels([f"{tick}" for tick in ticks_completos])
 
-        # Mostrar los límites inferiores y superiores en ambos extremos de la colorbar
-        cbar.ax.tick_params(which="both", direction="out", top=True, bottom=True)
+#///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
-        # Personalizar los valores del eje Y para que estén horizontales
-        ax.tick_params(axis="y", labelrotation=0)  # Configuración para etiquetas horizontales
+with ui.nav_panel("Ventilación natural"):
+    ui.h3("Horas aptas para ventilar")
+    f'''Los promedios esconden qué tan seguido una hora cae realmente dentro de la zona de confort. Aquí se revisa cada registro de
+    la estación: una hora es apta para ventilar si la temperatura está dentro de la zona de confort ASHRAE 55 (2013) de su mes y la 
+    humedad relativa entre {HR_MIN}% y {HR_MAX}%. Las gráficas muestran el porcentaje de horas aptas, considerando todos los años 
+    con los que se cuenta.'''
+
+    ui.h3("Por mes")
+    grafica_ventilacion_mensual = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_ventilacion_mensual():
+        matriz = fraccion_mensual(derivado("ventilacion"))
+        matriz = matriz.set_axis([meses[int(m)-1] for m in matriz.columns], axis=1)
+        clave = (datos()["ruta"], datos()["version"], "ventilacion_mensual")
+        grafica_ventilacion_mensual.pedir(clave, grafica_heatmap, matriz, 0, 100, ticks(0, 100, 10),
+                                          "Horas aptas [%]", "Horas aptas para ventilar por mes", "Mes")
+
+    @imagen_png(alt="ventilacion_mensual")
+    def ventilacion_mensual():
+        return grafica_ventilacion_mensual.imagen()
+
+    ui.h3("Por día")
+    grafica_ventilacion_diaria = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_ventilacion_diaria():
+        matriz = fraccion_diaria(derivado("ventilacion"))
+        clave = (datos()["ruta"], datos()["version"], "ventilacion_diaria")
+        grafica_ventilacion_diaria.pedir(clave, grafica_heatmap, matriz, 0, 100, ticks(0, 100, 10),
+                                         "Horas aptas [%]", "Horas aptas para ventilar por día", "Día")
+
+    @imagen_png(alt="ventilacion_diaria")
+    def ventilacion_diaria():
+        return grafica_ventilacion_diaria.imagen()
+
+
+#///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+with ui.nav_panel("Viento"):
+    ui.h3("Rosa de vientos")
+    '''El viento es el que mueve el aire a través de las ventanas: conocer de dónde sopla y con qué velocidad en cada época del año y
+    a cada hora ayuda a orientar las aberturas y a decidir cuándo abrirlas. La rosa de vientos muestra el porcentaje de registros 
+    en cada dirección, separado por clases de velocidad. Para una mejor visualización, usted puede modificar las siguientes 
+    características:'''
+    with ui.layout_columns():
+        with ui.card():
+            ui.card_header("Tiempo")
+            ui.input_slider("horario_viento", "Horario [horas]", min=0, max=23, value=[0, 23])
+            ui.input_slider("meses_viento", "Periodo [meses]", min=1, max=12, value=[1, 12])
 
-        # Personalizar el título y los ejes
-        plt.title("Humedad relativa promedios diarios", fontsize=12, fontweight="bold")
-        ax.set_ylabel("Tiempo [h]")
-        ax.set_xlabel("Mes")
+        with ui.card():
+            ui.card_header("Resumen")
 
-        return ax
-    
-    ui.h3("Conclusión")
-    '''En términos de humedad relavita, las horas en las que resulta conveniente la ventilación natural son aquellas que se 
-    encuentran entre los Límites de la norma ASHRAE 55 (2013), visibles al activar la opción de ajuste. Esto puede ayudar a 
-    mantener dentro de los límites la humedad del ambiente, con ello se puede reducir o evitar el uso de sistemas de control de
-    humedad.'''
+            @render.text
+            @medido
+            def resumen_viento():
+                f = frecuencias_viento()
+                req(f.sum() > 0)
+                dominante = ETIQUETAS_SECTOR[int(f.sum(axis=1).argmax())]
+                return f'''Dirección dominante = {dominante}, 
+                Calmas (< 0.5 m/s) = {round(f[:, 0].sum(), 2)}%'''
+
+    horario_viento = rebote(input.horario_viento)
+    meses_viento = rebote(input.meses_viento)
+
+    @reactive.calc
+    def frecuencias_viento():
+        return frecuencias(filtrar(derivado("viento"), meses_viento(), horario_viento()))
+
+    grafica_viento = TareaGrafica()
+
+    @reactive.effect
+    @medido
+    def pedir_rosa_vientos():
+        clave = (datos()["ruta"], datos()["version"], "rosa_vientos", meses_viento(), horario_viento())
+        grafica_viento.pedir(clave, grafica_rosa_vientos, frecuencias_viento(), ETIQUETAS_SECTOR, ETIQUETAS_VELOCIDAD,
+                             "Rosa de vientos")
+
+    @imagen_png(alt="rosa_vientos")
+    def rosa_vientos():
+        return grafica_viento.imagen()
+
+
+#///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+# Panel de diagnóstico sólo para administradores (ver diagnostico.py): se agrega a la barra de
+# navegación desde el servidor, así que la página pública ni siquiera lo incluye
+@reactive.calc
+def admin():
+    return diagnostico.es_admin(get_current_session().clientdata.url_search())
+
+
+with ui.hold():
+    @render.data_frame
+    def diagnostico_indicadores():
+        req(admin())
+        reactive.invalidate_later(5)
+        tiempos = [(f"arranque: {evento} [s]", round(t, 2)) for evento, t in arranque.tiempos.items()]
+        return pd.DataFrame([(n, v) for n, _, _, v in diagnostico.indicadores()] + tiempos,
+                            columns=["indicador", "valor"])
+
+    @render.data_frame
+    def diagnostico_latencias():
+        req(admin())
+        reactive.invalidate_later(5)
+        return pd.DataFrame(metricas.histogramas(),
+                            columns=["métrica", "etiquetas", "n", "media_ms", "p50_ms", "p90_ms", "p99_ms"])
+
+    @render.data_frame
+    def diagnostico_contadores():
+        req(admin())
+        reactive.invalidate_later(5)
+        return pd.DataFrame(metricas.contadores(), columns=["métrica", "etiquetas", "valor"])
+
+    @render.data_frame
+    def diagnostico_calidad():
+        req(admin())
+        return control_calidad.resumen(derivado("calidad"))
+
+
+@reactive.effect
+def panel_diagnostico():
+    req(admin())
+    ui.insert_nav_panel("page", ui.nav_panel(
+        "Diagnóstico",
+        ui.h3("Estado del proceso"),
+        output_data_frame("diagnostico_indicadores"),
+        ui.h3("Latencias"),
+        ui.p("Percentiles estimados con las cubetas de los histogramas (límite superior de la cubeta)."),
+        output_data_frame("diagnostico_latencias"),
+        ui.h3("Contadores"),
+        output_data_frame("diagnostico_contadores"),
+        ui.h3("Calidad de los datos"),
+        ui.p("Valores de la estación elegida (todos los años) que pasaron la revisión, que faltaban, que se "
+             "descartaron por estar fuera de rango o ser picos, y que se rellenaron interpolando huecos cortos."),
+        output_data_frame("diagnostico_calidad"),
+    ))
@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+import time
+
+import estaciones
+import trabajadores
+import vistas
+
+# Arranque de la app: el puerto se abre sin esperar a los datos. En un hilo aparte se preparan
+# las estaciones (hasta MAX_ESTACIONES) y, cuando el servidor ya terminó de arrancar, se levantan
+# los trabajadores de las gráficas (antes competirían por CPU con el arranque) y se dibujan en
+# ellos las vistas por defecto de cada estación (vistas.py), que se vuelven a dibujar cuando los
+# datos de una estación cambian; listo() indica cuándo terminó todo. Los tiempos desde que se
+# importó la app se registran con logging (nivel INFO). Los resultados derivados de cada estación
+# (ventilación, viento, percentiles, calidad) también se calculan aquí, nunca en el ciclo de eventos.
+INICIO = time.monotonic()
+# Segundos que la interfaz espera a la estación por defecto para tomar de ella los rangos iniciales
+# de los sliders; si no alcanza, las sesiones los ajustan en cuanto llegan los datos
+ESPERA = float(os.environ.get("ECOVENT_ESPERA_INICIAL_S", 2))
+# Cada cuántos segundos se revisa si alguna estación cambió para dibujar sus vistas por defecto
+INTERVALO = 1
+
+_estaciones = threading.Event()
+_trabajadores = threading.Event()
+_vistas = threading.Event()
+_primera = threading.Event()
+_hilo = None
+_hilo_trabajadores = None
+_esperado = False
+_pedidas = set()
+# Versión de los datos de cada estación con sus vistas por defecto ya dibujadas
+_precalentadas = {}
+_candado = threading.Lock()
+log = logging.getLogger(__name__)
+# Segundos desde INICIO de cada evento del arranque ("primera estación", "estaciones listas",
+# "trabajadores listos", "vistas por defecto listas", "primera respuesta")
+tiempos = {}
+
+
+def _registrar(evento):
+    with _candado:
+        if evento in tiempos:
+            return
+        tiempos[evento] = time.monotonic() - INICIO
+    log.info("arranque: %s a los %.2f s", evento, tiempos[evento])
+
+
+def _precalcular():
+    try:
+        for i, ruta in enumerate(list(estaciones.disponibles())[:estaciones.MAX_ESTACIONES]):
+            estaciones.estacion(ruta)
+            if i == 0:
+                _registrar("primera estación")
+                _primera.set()
+    except Exception:
+        log.exception("arranque: falló la preparación de las estaciones")
+    finally:
+        _primera.set()
+        _registrar("estaciones listas")
+        _estaciones.set()
+    # Después de tener todas las estaciones, para que la primera vista no espere a los derivados
+    for ruta in estaciones.cargadas():
+        try:
+            estaciones.derivados(estaciones.estacion(ruta))
+        except Exception:
+            log.exception("arranque: falló el cálculo de los derivados de %s", ruta)
+
+
+def _precalentar():
+    # Vistas por defecto de las estaciones en memoria cuya versión aún no se dibujó
+    futuros = []
+    for ruta in estaciones.disponibles():
+        d = estaciones.cargada(ruta)
+        if d is None or _precalentadas.get(ruta) == d["version"]:
+            continue
+        for clave, fn, args in vistas.por_defecto(d):
+            futuros.append(trabajadores.precalentar(clave, fn, *args))
+        _precalentadas[ruta] = d["version"]
+    for futuro in futuros:
+        if futuro is not None:
+            futuro.result()
+
+
+def _calentar():
+    try:
+        trabajadores.arrancar()
+    except Exception:
+        log.exception("arranque: no se pudieron levantar los trabajadores")
+    finally:
+        _registrar("trabajadores listos")
+        _trabajadores.set()
+    # Con ECOVENT_TRABAJADORES=0 se dibuja en el proceso de la app, donde pyplot no admite
+    # dibujar desde otro hilo: no se dibuja de antemano
+    _estaciones.wait()
+    vistos = None
+    while trabajadores.N_TRABAJADORES > 0:
+        try:
+            if estaciones.cambios() != vistos:
+                vistos = estaciones.cambios()
+                _precalentar()
+        except Exception:
+            log.exception("arranque: falló el dibujo de las vistas por defecto")
+        if not _vistas.is_set():
+            _registrar("vistas por defecto listas")
+            _vistas.set()
+        time.sleep(INTERVALO)
+    _vistas.set()
+
+
+def iniciar():
+    global _hilo
+    with _candado:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_precalcular, daemon=True, name="arranque")
+            _hilo.start()
+
+
+def calentar():
+    # Lo llama el servidor al terminar de arrancar (servidor.py) o, si no, la primera sesión
+    global _hilo_trabajadores
+    with _candado:
+        if _hilo_trabajadores is None:
+            _hilo_trabajadores = threading.Thread(target=_calentar, daemon=True, name="trabajadores")
+            _hilo_trabajadores.start()
+
+
+def listo():
+    return _estaciones.is_set() and _trabajadores.is_set() and _vistas.is_set()
+
+
+def inicial(ruta):
+    # La estación por defecto para construir la interfaz. Sólo la primera vez (al armar la
+    # página al arrancar) se espera hasta ESPERA segundos; None si todavía no está
+    global _esperado
+    if not _esperado:
+        _esperado = True
+        _primera.wait(ESPERA)
+    return estaciones.cargada(ruta)
+
+
+def pedir(ruta):
+    # Prepara una estación y sus resultados derivados en segundo plano; la sesión que la pidió
+    # vuelve a preguntar por ellos
+    if ruta not in estaciones.disponibles():
+        raise KeyError(f"Estación desconocida: {ruta}")
+
+    def preparar():
+        try:
+            estaciones.derivados(estaciones.estacion(ruta))
+        except Exception:
+            log.exception("arranque: no se pudo preparar %s", ruta)
+        finally:
+            with _candado:
+                _pedidas.discard(ruta)
+
+    with _candado:
+        if ruta in _pedidas:
+            return
+        _pedidas.add(ruta)
+    threading.Thread(target=preparar, daemon=True, name="estacion").start()
+
+
+def primera_respuesta():
+    _registrar("primera respuesta")
+    calentar()
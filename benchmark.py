@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import calidad
+import datos
+import estaciones
+import vistas
+from climatologia import (VARIABLES, ACUMULADORES_CONFORT, climatologia, prefijos, periodo, tabla_mensual,
+                          tabla_diaria, zona_confort, confort_diario, zona_confort_diaria)
+
+# Benchmark de la carga, agregación y dibujo de una estación con datos sintéticos en el mismo
+# esquema que data/ (TIMESTAMP,Temp_Avg,RH_Avg,WSpeed_Avg,WDir_Avg), horarios y cada 10 minutos,
+# de 1 a 50 años. Cada etapa se mide varias veces (se reporta el mínimo y la mediana) y una vez
+# más con tracemalloc para el pico de memoria. Los resultados se guardan en JSON junto con el
+# commit (en --carpeta, fuera del repositorio), para comparar dos corridas con --comparar.
+#
+#   python benchmark.py                       # todas las combinaciones
+#   python benchmark.py --anios 1 10 --resoluciones 1h
+#   python benchmark.py --comparar antes.json despues.json
+RESOLUCIONES = ("1h", "10min")
+ANIOS = (1, 5, 10, 25, 50)
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+INICIO = "2000-01-01"
+
+
+def generar(ruta, anios, resolucion, semilla=0):
+    # Ciclo anual y diario de temperatura con ruido; la HR baja cuando sube la temperatura
+    inicio = pd.Timestamp(INICIO)
+    indice = pd.date_range(inicio, inicio + pd.DateOffset(years=anios), freq=resolucion, inclusive="left",
+                           name="TIMESTAMP")
+    rng = np.random.default_rng(semilla)
+    n = len(indice)
+    dia = indice.dayofyear.to_numpy()
+    hora = indice.hour.to_numpy() + indice.minute.to_numpy() / 60
+    T = (22 + 4 * np.cos(2 * np.pi * (dia - 130) / 365) + 6 * np.cos(2 * np.pi * (hora - 15) / 24)
+         + rng.normal(0, 1.5, n))
+    HR = np.clip(55 - 2.5 * (T - 22) + 15 * np.cos(2 * np.pi * (dia - 250) / 365) + rng.normal(0, 8, n), 5, 100)
+    df = pd.DataFrame({
+        "Temp_Avg": T.round(2),
+        "RH_Avg": HR.round(2),
+        "WSpeed_Avg": rng.gamma(2, 0.8, n).round(3),
+        "WDir_Avg": rng.uniform(0, 360, n).round(1),
+    }, index=indice)
+    df.to_csv(ruta, date_format=FORMATO_FECHA)
+    return n
+
+
+def medir(fn, repeticiones, antes=None):
+    # Segundos de cada repetición y pico de memoria [MB] de una repetición extra con tracemalloc
+    tiempos = []
+    for _ in range(repeticiones):
+        if antes is not None:
+            antes()
+        t = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t)
+    if antes is not None:
+        antes()
+    tracemalloc.start()
+    try:
+        fn()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "min_s": min(tiempos),
+        "mediana_s": statistics.median(tiempos),
+        "pico_mb": pico / 2 ** 20,
+    }
+
+
+def etapas(ruta):
+    # (nombre, función, preparación) de cada etapa medida; la preparación no se cronometra
+    def sin_cache():
+        shutil.rmtree(datos.ruta_cache(ruta), ignore_errors=True)
+
+    def confort(df):
+        # Temperatura prevaleciente de cada día y límites de confort de todos los años
+        acumulado = confort_diario(df)
+        anios = acumulado["anios"][[0, -1]]
+        return zona_confort_diaria(periodo(prefijos(acumulado, ACUMULADORES_CONFORT), *anios, ACUMULADORES_CONFORT))
+
+    crudo = datos.leer_csv(ruta)
+    df = datos.cargar_estacion(ruta)
+    clima = climatologia(df, VARIABLES)
+    total = periodo(prefijos(clima), *clima["anios"][[0, -1]])
+    To = tabla_mensual(total, "Temp_Avg")
+    d = estaciones.preparar(ruta)
+
+    lista = [
+        ("csv", lambda: datos.leer_csv(ruta), None),
+        ("calidad", lambda: calidad.depurar(crudo), None),
+        ("cache_frio", lambda: datos.cargar_estacion(ruta), sin_cache),
+        ("cache_tibio", lambda: datos.cargar_estacion(ruta), None),
+        ("climatologia", lambda: climatologia(df, VARIABLES), None),
+        ("tablas_mes_hora", lambda: [tabla_mensual(total, v) for v in VARIABLES], None),
+        ("tablas_dia_hora", lambda: [tabla_diaria(total, v) for v in VARIABLES], None),
+        ("zona_confort", lambda: zona_confort(To), None),
+        ("zona_confort_diaria", lambda: confort(df), None),
+        ("preparar_frio", lambda: estaciones.preparar(ruta), sin_cache),
+        ("preparar_tibio", lambda: estaciones.preparar(ruta), None),
+    ]
+    for clave, fn, args in vistas.por_defecto(d):
+        lista.append((f"dibujo_{clave[3]}", lambda fn=fn, args=args: fn(*args), None))
+    return lista
+
+
+def verificar(ruta, filas, resolucion):
+    # La serie sintética no tiene huecos: al construir el cache desde cero la depuración no debe
+    # agregar ni quitar filas, y el paso detectado debe ser el de la resolución
+    shutil.rmtree(datos.ruta_cache(ruta), ignore_errors=True)
+    df = datos.cargar_estacion(ruta)
+    paso = calidad.frecuencia(df.index)
+    if len(df) != filas or paso != pd.Timedelta(resolucion):
+        raise AssertionError(f"{ruta}: {len(df)} filas con paso {paso} en el cache, {filas} filas cada "
+                             f"{resolucion} en el CSV")
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def correr(carpeta, anios, resoluciones, repeticiones):
+    os.makedirs(carpeta, exist_ok=True)
+    resultados = []
+    for resolucion in resoluciones:
+        for n_anios in anios:
+            ruta = os.path.join(carpeta, f"sintetica_{resolucion}_{n_anios}a.csv")
+            # Los CSV generados se reutilizan entre corridas (el contenido depende sólo de la semilla)
+            if not os.path.exists(ruta):
+                generar(ruta, n_anios, resolucion)
+            filas = len(datos.leer_csv(ruta))
+            verificar(ruta, filas, resolucion)
+            for etapa, fn, antes in etapas(ruta):
+                medida = medir(fn, repeticiones, antes)
+                resultados.append({"resolucion": resolucion, "anios": n_anios, "filas": filas, "etapa": etapa, **medida})
+                print(f"{resolucion:>5} {n_anios:>3} años {etapa:<26} {medida['min_s']:9.4f} s {medida['pico_mb']:9.1f} MB")
+    return {
+        "commit": _commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "maquina": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeticiones": repeticiones,
+        "resultados": resultados,
+    }
+
+
+def comparar(antes, despues):
+    # Cociente del tiempo mínimo (después / antes) de cada etapa presente en ambas corridas
+    def indice(corrida):
+        return {(r["resolucion"], r["anios"], r["etapa"]): r for r in corrida["resultados"]}
+
+    a, b = indice(antes), indice(despues)
+    print(f"{antes['commit']} -> {despues['commit']}")
+    for clave in sorted(a.keys() & b.keys()):
+        cociente = b[clave]["min_s"] / a[clave]["min_s"] if a[clave]["min_s"] > 0 else float("nan")
+        print(f"{clave[0]:>5} {clave[1]:>3} años {clave[2]:<26} {a[clave]['min_s']:9.4f} s {b[clave]['min_s']:9.4f} s "
+              f"x{cociente:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga, agregación y dibujo con estaciones sintéticas")
+    parser.add_argument("--anios", type=int, nargs="+", default=list(ANIOS))
+    parser.add_argument("--resoluciones", nargs="+", default=list(RESOLUCIONES))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--carpeta", default=os.path.join(tempfile.gettempdir(), "ecovent_benchmark"),
+                        help="dónde se generan los CSV sintéticos, sus caches y los resultados")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto <carpeta>/benchmark_<commit>.json)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0]) as a, open(args.comparar[1]) as b:
+            comparar(json.load(a), json.load(b))
+        return
+
+    corrida = correr(args.carpeta, args.anios, args.resoluciones, args.repeticiones)
+    salida = args.salida or os.path.join(args.carpeta, f"benchmark_{(corrida['commit'] or 'local')[:10]}.json")
+    with open(salida, "w") as f:
+        json.dump(corrida, f, indent=1)
+    print(f"Resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
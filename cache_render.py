@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Cache de imágenes ya renderizadas (PNG), compartido por todas las sesiones del proceso.
+# La clave es (estación, versión de los datos, tipo de gráfica, entradas normalizadas), así que
+# dos sesiones con los mismos sliders reciben la misma imagen sin volver a dibujarla.
+# Opcionalmente las imágenes también se guardan en disco para sobrevivir a reinicios; la carpeta
+# se poda por tamaño, borrando primero las imágenes usadas hace más tiempo.
+MAX_MB = float(os.environ.get("ECOVENT_CACHE_RENDER_MB", 64))
+DIR_DISCO = os.environ.get("ECOVENT_CACHE_RENDER_DIR")
+MAX_MB_DISCO = float(os.environ.get("ECOVENT_CACHE_RENDER_DISCO_MB", 512))
+# Subir cuando cambie el aspecto de las gráficas (graficas.py) para no servir las imágenes
+# anteriores guardadas en disco
+VERSION_RENDER = 1
+
+
+def normalizar(valor):
+    # Los sliders entregan listas y flotantes con ruido (y enteros cuando el valor es exacto, 10 en
+    # lugar de 10.0); todo número se pasa a flotante redondeado para que estados equivalentes
+    # compartan la misma clave y el mismo archivo en disco
+    if isinstance(valor, (list, tuple)):
+        return tuple(normalizar(v) for v in valor)
+    if isinstance(valor, (int, float, np.integer, np.floating)) and not isinstance(valor, (bool, np.bool_)):
+        return round(float(valor), 2)
+    return valor
+
+
+class CacheRender:
+    def __init__(self, max_bytes, carpeta=None, max_bytes_disco=None):
+        self.max_bytes = max_bytes
+        self.max_bytes_disco = max_bytes_disco
+        self.carpeta = carpeta
+        self.bytes = 0
+        self.bytes_disco = 0
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._imagenes = OrderedDict()
+        self._candado = threading.Lock()
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+            self._podar()
+
+    def _archivo(self, clave):
+        return os.path.join(self.carpeta, hashlib.sha1(repr((VERSION_RENDER, clave)).encode()).hexdigest() + ".png")
+
+    def _podar(self):
+        # Recalcula lo que ocupa la carpeta y, si pasa del límite, borra las imágenes con la fecha
+        # de modificación más antigua (se actualiza en cada acierto) hasta quedar en 3/4 del límite
+        archivos = []
+        with os.scandir(self.carpeta) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".png"):
+                    try:
+                        estado = entrada.stat()
+                    except OSError:
+                        continue
+                    archivos.append((estado.st_mtime, estado.st_size, entrada.path))
+        total = sum(tamano for _, tamano, _ in archivos)
+        if self.max_bytes_disco is not None and total > self.max_bytes_disco:
+            for _, tamano, ruta in sorted(archivos):
+                if total <= self.max_bytes_disco * 3 // 4:
+                    break
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    continue
+                total -= tamano
+        with self._candado:
+            self.bytes_disco = total
+
+    def _guardar(self, clave, imagen):
+        anterior = self._imagenes.pop(clave, None)
+        if anterior is not None:
+            self.bytes -= len(anterior)
+        self._imagenes[clave] = imagen
+        self.bytes += len(imagen)
+        while self.bytes > self.max_bytes and len(self._imagenes) > 1:
+            _, descartada = self._imagenes.popitem(last=False)
+            self.bytes -= len(descartada)
+
+    def obtener(self, clave):
+        clave = normalizar(clave)
+        with self._candado:
+            imagen = self._imagenes.get(clave)
+            if imagen is not None:
+                self._imagenes.move_to_end(clave)
+                self.aciertos += 1
+                return imagen
+        if self.carpeta:
+            archivo = self._archivo(clave)
+            try:
+                with open(archivo, "rb") as f:
+                    imagen = f.read()
+                os.utime(archivo)
+            except OSError:
+                pass
+            else:
+                with self._candado:
+                    self._guardar(clave, imagen)
+                    self.aciertos_disco += 1
+                return imagen
+        with self._candado:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, imagen):
+        clave = normalizar(clave)
+        with self._candado:
+            self._guardar(clave, imagen)
+        if self.carpeta:
+            archivo = self._archivo(clave)
+            tmp = f"{archivo}.{os.getpid()}"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(imagen)
+                os.replace(tmp, archivo)
+            except OSError:
+                return
+            with self._candado:
+                self.bytes_disco += len(imagen)
+                podar = self.max_bytes_disco is not None and self.bytes_disco > self.max_bytes_disco
+            if podar:
+                self._podar()
+
+    def contiene(self, clave):
+        # Sin contar aciertos ni fallos: para saber si vale la pena dibujar de antemano
+        clave = normalizar(clave)
+        with self._candado:
+            if clave in self._imagenes:
+                return True
+        return bool(self.carpeta) and os.path.exists(self._archivo(clave))
+
+    def estadisticas(self):
+        with self._candado:
+            return {
+                "aciertos": self.aciertos,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "imagenes": len(self._imagenes),
+                "bytes": self.bytes,
+                "bytes_disco": self.bytes_disco,
+            }
+
+
+cache = CacheRender(int(MAX_MB * 1024 * 1024), DIR_DISCO, int(MAX_MB_DISCO * 1024 * 1024))
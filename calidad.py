@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from climatologia import HORAS, MESES, ETIQUETAS_MES, claves
+
+# Control de calidad al cargar una estación, antes de guardar sus columnas en el cache: la serie
+# se lleva a una malla regular con su frecuencia de muestreo, se descartan los valores imposibles
+# (fuera de rango físico) y los picos (lejos de la mediana móvil de su vecindad), y los huecos
+# cortos se rellenan interpolando en el tiempo. Cada valor lleva una marca con lo que se le hizo,
+# y las marcas se cuentan por año, mes y hora. Todo se resuelve con operaciones sobre arreglos
+# completos, sin recorrer las filas.
+FALTANTE = 1       # la fila no venía en el CSV o el valor estaba vacío
+FUERA_DE_RANGO = 2
+PICO = 4
+RELLENO = 8
+DESCARTADO = FUERA_DE_RANGO | PICO
+
+# Límites físicos de cada variable; fuera de ellos el valor se descarta
+LIMITES = {
+    "Temp_Avg": (-40.0, 60.0),
+    "RH_Avg": (0.0, 100.0),
+    "WSpeed_Avg": (0.0, 75.0),
+    "WDir_Avg": (0.0, 360.0),
+}
+# Diferencia máxima con la mediana de la ventana centrada: más lejos es un pico del sensor.
+# La velocidad y la dirección del viento cambian de golpe por sí solas y no se revisan
+PICOS = {
+    "Temp_Avg": 8.0,
+    "RH_Avg": 30.0,
+}
+VENTANA = pd.Timedelta("3h")
+# Huecos de hasta esta duración se rellenan con interpolación lineal; "0" no rellena nada.
+# La dirección del viento es circular y no se interpola
+MAX_HUECO = pd.Timedelta(os.environ.get("ECOVENT_MAX_HUECO", "2h"))
+INTERPOLABLES = ("Temp_Avg", "RH_Avg", "WSpeed_Avg")
+FRECUENCIA = pd.Timedelta("1h")
+# Filas anteriores que se necesitan para revisar y rellenar el comienzo de un bloque nuevo
+CONTEXTO = 64
+# Filas de la malla por cada fila leída a partir de las cuales el paso se considera mal detectado
+# (una estación con huecos largos queda muy por debajo)
+MAX_EXPANSION = 20
+
+# Cambia si cambia cualquier parámetro: el cache de las estaciones se reconstruye
+CONFIGURACION = repr((LIMITES, PICOS, VENTANA.value, MAX_HUECO.value, INTERPOLABLES))
+
+ACUMULADORES = ("n_validas", "n_faltantes", "n_descartadas", "n_rellenadas")
+
+
+def columna_marca(columna):
+    return f"{columna}_calidad"
+
+
+def frecuencia(indice):
+    # Paso más común entre registros consecutivos (la mediana no se deja llevar por los huecos).
+    # read_csv puede dar el índice en µs o en s: las diferencias se pasan a ns antes de medirlas
+    pasos = np.diff(indice.values).astype("timedelta64[ns]").view("int64")
+    pasos = pasos[pasos > 0]
+    if len(pasos) == 0:
+        return FRECUENCIA
+    return pd.Timedelta(int(np.median(pasos)), unit="ns")
+
+
+def _picos(x, ventana, umbral):
+    mediana = pd.Series(x).rolling(ventana, center=True, min_periods=ventana // 2 + 1).median().to_numpy()
+    with np.errstate(invalid="ignore"):
+        return np.abs(x - mediana) > umbral
+
+
+def _huecos_cortos(falta, maximo):
+    # Posiciones de las rachas de NaN de a lo más `maximo` muestras con datos a ambos lados
+    borde = np.diff(np.concatenate(([0], falta.view(np.int8), [0])))
+    inicios, fines = np.flatnonzero(borde == 1), np.flatnonzero(borde == -1)
+    cortos = (fines - inicios <= maximo) & (inicios > 0) & (fines < len(falta))
+    cambio = np.zeros(len(falta) + 1, dtype=np.int64)
+    np.add.at(cambio, inicios[cortos], 1)
+    np.add.at(cambio, fines[cortos], -1)
+    return np.cumsum(cambio[:-1]) > 0
+
+
+def depurar(df, paso=None, previo=None):
+    # Serie en la malla regular de `paso` (si no se da, la frecuencia de df) con los valores
+    # descartados en NaN, los huecos cortos rellenos y una columna de marcas por variable.
+    # `previo` son las últimas filas ya depuradas: la malla sigue donde terminaron y sirven de
+    # vecindad para los picos y los huecos del comienzo; sólo se devuelven las filas nuevas
+    df = df.apply(pd.to_numeric, errors="coerce").astype("float64")
+    df.index = df.index.astype("datetime64[ns]")
+    paso = paso or frecuencia(df.index)
+    df.index = df.index.round(paso)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    if previo is not None and len(previo):
+        inicio = previo.index[-1] + paso
+        df = df[df.index >= inicio]
+    else:
+        previo = df.iloc[:0]
+        inicio = df.index[0] if len(df) else None
+    if len(df) == 0:
+        limpio = df.copy()
+        for c in df.columns:
+            limpio[columna_marca(c)] = np.zeros(0, dtype=np.int8)
+        return limpio
+
+    filas = (df.index[-1] - inicio) // paso + 1
+    if filas > MAX_EXPANSION * (len(df) + CONTEXTO):
+        raise ValueError(f"{len(df)} registros con paso de {paso} darían una malla de {filas} filas")
+    malla = pd.date_range(inicio, df.index[-1], freq=paso, name=df.index.name).astype("datetime64[ns]")
+    df = df.reindex(malla)
+    k = len(previo)
+    ventana = max(3, int(VENTANA / paso) | 1)
+    max_hueco = int(MAX_HUECO / paso)
+
+    limpio = pd.DataFrame(index=malla)
+    for c in df.columns:
+        x = np.concatenate((previo[c].to_numpy(dtype="float64"), df[c].to_numpy()))
+        marca = np.where(np.isfinite(x), 0, FALTANTE).astype(np.int8)
+        if c in LIMITES:
+            bajo, alto = LIMITES[c]
+            with np.errstate(invalid="ignore"):
+                marca[(x < bajo) | (x > alto)] |= FUERA_DE_RANGO
+            x[marca != 0] = np.nan
+        if c in PICOS:
+            marca[_picos(x, ventana, PICOS[c])] |= PICO
+            x[marca != 0] = np.nan
+        if c in INTERPOLABLES and max_hueco > 0:
+            falta = ~np.isfinite(x)
+            relleno = _huecos_cortos(falta, max_hueco)
+            if relleno.any():
+                posicion = np.arange(len(x))
+                x[relleno] = np.interp(posicion[relleno], posicion[~falta], x[~falta])
+                marca[relleno] |= RELLENO
+        limpio[c] = x[k:]
+        limpio[columna_marca(c)] = marca[k:]
+    return limpio
+
+
+def conteos(df, variables=None):
+    # Valores válidos, faltantes, descartados y rellenados de cada variable por año, mes y hora,
+    # con la forma (variables, años, meses, horas) de las climatologías
+    if variables is None:
+        variables = [c for c in LIMITES if columna_marca(c) in df]
+    mes, _, hora = claves(df.index)
+    anios, anio = np.unique(df.index.year.to_numpy(dtype=np.int64), return_inverse=True)
+    celda = (anio * MESES + mes) * HORAS + hora
+    n_celdas = len(anios) * MESES * HORAS
+    resultado = {"variables": list(variables), "anios": anios}
+    for clave, condicion in (
+        ("n_validas", lambda m: m & (FALTANTE | DESCARTADO) == 0),
+        ("n_faltantes", lambda m: m & FALTANTE != 0),
+        ("n_descartadas", lambda m: m & DESCARTADO != 0),
+        ("n_rellenadas", lambda m: m & RELLENO != 0),
+    ):
+        resultado[clave] = np.stack([
+            np.bincount(celda[condicion(df[columna_marca(v)].to_numpy())], minlength=n_celdas)
+            for v in variables
+        ]).astype(np.int32).reshape(-1, len(anios), MESES, HORAS)
+    return resultado
+
+
+def resumen(conteo):
+    # Porcentaje de valores válidos, faltantes, descartados y rellenados por variable y mes
+    filas = []
+    for i, v in enumerate(conteo["variables"]):
+        n = {clave: conteo[clave][i].sum(axis=(0, 2)) for clave in ACUMULADORES}
+        esperadas = n["n_validas"] + n["n_faltantes"] + n["n_descartadas"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for m in range(MESES):
+                filas.append([v, ETIQUETAS_MES[m], int(esperadas[m])] +
+                             [round(100 * n[clave][m] / esperadas[m], 2) for clave in ACUMULADORES])
+    return pd.DataFrame(filas, columns=["variable", "mes", "esperadas", "% válidas", "% faltantes",
+                                        "% descartadas", "% rellenadas"])
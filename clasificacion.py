@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from climatologia import HORAS, MESES, DIAS, ETIQUETAS_HORA, ETIQUETAS_MES, ETIQUETAS_DIA, claves
+
+# Clasificación de cada registro (no de los promedios) como frío / confort / calor según la
+# zona de confort ASHRAE 55 de su mes, y como seco / adecuado / húmedo según los límites de HR.
+# Cada registro cae en una de 9 clases; los conteos por clase se acumulan con np.bincount por
+# (mes, hora) y por (día, hora), sin recorrer las filas en Python.
+HR_MIN = 20
+HR_MAX = 60
+
+FRIO, CONFORT, CALOR = 0, 1, 2
+SECO, HR_ADECUADA, HUMEDO = 0, 1, 2
+CLASES = 9
+# Clase de las horas aptas para ventilar: temperatura en la zona de confort y HR adecuada
+APTA = CONFORT * 3 + HR_ADECUADA
+
+
+def clasificar(T, HR, lim_inf, lim_sup):
+    # Clase 3 * clase_T + clase_HR de cada registro; -1 si falta la temperatura o la humedad
+    clase_T = (T >= lim_inf).astype(np.int8) + (T > lim_sup)
+    clase_HR = (HR >= HR_MIN).astype(np.int8) + (HR > HR_MAX)
+    clase = clase_T * 3 + clase_HR
+    clase[~(np.isfinite(T) & np.isfinite(HR))] = -1
+    return clase
+
+
+def conteos(df, Zona_confort):
+    mes, dia, hora = claves(df.index)
+    clase = clasificar(
+        df["Temp_Avg"].to_numpy(dtype="float64"),
+        df["RH_Avg"].to_numpy(dtype="float64"),
+        Zona_confort["Lim_inf"].to_numpy()[mes],
+        Zona_confort["Lim_sup"].to_numpy()[mes],
+    )
+    validos = clase >= 0
+    clase = clase[validos]
+    celda_mes = (mes[validos] * HORAS + hora[validos]) * CLASES + clase
+    celda_dia = (dia[validos] * HORAS + hora[validos]) * CLASES + clase
+    return {
+        "conteos_mes": np.bincount(celda_mes, minlength=MESES * HORAS * CLASES).reshape(MESES, HORAS, CLASES),
+        "conteos_dia": np.bincount(celda_dia, minlength=DIAS * HORAS * CLASES).reshape(DIAS, HORAS, CLASES),
+    }
+
+
+def fraccion(conteos, clase=APTA):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return conteos[..., clase] / conteos.sum(axis=-1)
+
+
+def _tabla(conteos, etiquetas):
+    # Porcentaje de horas aptas con horas en filas y periodos en columnas, como las tablas de medias
+    con_datos = conteos.sum(axis=(1, 2)) > 0
+    return pd.DataFrame(
+        100 * fraccion(conteos)[con_datos].T,
+        index=ETIQUETAS_HORA,
+        columns=[e for e, c in zip(etiquetas, con_datos) if c],
+    )
+
+
+def fraccion_mensual(ventilacion):
+    return _tabla(ventilacion["conteos_mes"], ETIQUETAS_MES)
+
+
+def fraccion_diaria(ventilacion):
+    return _tabla(ventilacion["conteos_dia"], ETIQUETAS_DIA)
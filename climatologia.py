@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+# Climatologías horarias por mes (mes x hora) y por día del año (día x hora).
+# Las claves se derivan como enteros directamente del DatetimeIndex y las medias se obtienen
+# con sumas y conteos de np.bincount, en una sola pasada para todas las variables.
+# Las sumas y conteos se guardan por año; con sus sumas acumuladas sobre los años, cualquier
+# rango de años contiguo se obtiene con una resta, sin volver a agrupar la serie.
+VARIABLES = ("Temp_Avg", "RH_Avg")
+ACUMULADORES = ("suma_mes", "n_mes", "suma_dia", "n_dia")
+ACUMULADORES_CONFORT = ("suma_prevaleciente", "n_prevaleciente")
+# Peso de la media móvil exponencial de la temperatura exterior prevaleciente
+# (ASHRAE 55 recomienda entre 0.6 y 0.9)
+ALFA = 0.8
+
+HORAS = 24
+MESES = 12
+DIAS = 366
+
+# Días por mes en un calendario bisiesto: el 29 de febrero siempre ocupa la misma columna
+DIAS_MES = np.array([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+INICIO_MES = np.concatenate(([0], np.cumsum(DIAS_MES)[:-1]))
+# Posición [mes, día del mes] de cada uno de los 366 días del calendario
+MES_DE_DIA = np.repeat(np.arange(MESES), DIAS_MES)
+DIA_DE_MES = np.arange(DIAS) - INICIO_MES[MES_DE_DIA]
+
+ETIQUETAS_HORA = [f"{h:02d}:00" for h in range(HORAS)]
+ETIQUETAS_MES = [f"{m:02d}" for m in range(1, MESES + 1)]
+ETIQUETAS_DIA = [f"{m:02d}-{d:02d}" for m in range(1, MESES + 1) for d in range(1, DIAS_MES[m - 1] + 1)]
+
+
+def claves(indice):
+    mes = indice.month.to_numpy(dtype=np.int64) - 1
+    dia = INICIO_MES[mes] + indice.day.to_numpy(dtype=np.int64) - 1
+    hora = indice.hour.to_numpy(dtype=np.int64)
+    return mes, dia, hora
+
+
+def acumular(celda, valores, n_celdas):
+    # valores tiene forma (variables, filas); cada variable se desplaza a su propio bloque de celdas
+    # para resolver todas con un solo bincount. Los NaN no suman ni cuentan, igual que groupby().mean()
+    n_var = valores.shape[0]
+    validos = np.isfinite(valores)
+    celdas = (celda[None, :] + n_celdas * np.arange(n_var)[:, None])[validos]
+    suma = np.bincount(celdas, weights=valores[validos], minlength=n_var * n_celdas)
+    n = np.bincount(celdas, minlength=n_var * n_celdas)
+    return suma.reshape(n_var, n_celdas), n.reshape(n_var, n_celdas)
+
+
+def medias(suma, n):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return suma / n
+
+
+def climatologia(df, variables=VARIABLES):
+    mes, dia, hora = claves(df.index)
+    anios, anio = np.unique(df.index.year.to_numpy(dtype=np.int64), return_inverse=True)
+    valores = np.vstack([df[v].to_numpy(dtype="float64") for v in variables])
+
+    n_anios = len(anios)
+    suma_mes, n_mes = acumular((anio * MESES + mes) * HORAS + hora, valores, n_anios * MESES * HORAS)
+    suma_dia, n_dia = acumular((anio * DIAS + dia) * HORAS + hora, valores, n_anios * DIAS * HORAS)
+    return {
+        "variables": list(variables),
+        "anios": anios,
+        "suma_mes": suma_mes.reshape(-1, n_anios, MESES, HORAS),
+        "n_mes": n_mes.reshape(-1, n_anios, MESES, HORAS),
+        "suma_dia": suma_dia.reshape(-1, n_anios, DIAS, HORAS),
+        "n_dia": n_dia.reshape(-1, n_anios, DIAS, HORAS),
+    }
+
+
+def sumar(a, b, acumuladores=ACUMULADORES):
+    # Las sumas y conteos son acumuladores: la climatología de dos bloques de filas es la suma
+    # de ambas, año por año (el segundo bloque puede traer años nuevos)
+    anios = np.union1d(a["anios"], b["anios"])
+    total = {"variables": a["variables"], "anios": anios}
+    for clave in acumuladores:
+        forma = (a[clave].shape[0], len(anios)) + a[clave].shape[2:]
+        total[clave] = np.zeros(forma, dtype=np.result_type(a[clave], b[clave]))
+        for parte in (a, b):
+            total[clave][:, np.searchsorted(anios, parte["anios"])] += parte[clave]
+    return total
+
+
+def prefijos(clima, acumuladores=ACUMULADORES):
+    # Sumas acumuladas sobre el eje de años, con un primer renglón en cero:
+    # los años [i, j) suman P[:, j] - P[:, i]
+    acumulado = {"variables": clima["variables"], "anios": clima["anios"]}
+    for clave in acumuladores:
+        x = clima[clave]
+        acumulado[clave] = np.concatenate((np.zeros_like(x[:, :1]), np.cumsum(x, axis=1)), axis=1)
+    return acumulado
+
+
+def periodo(acumulado, desde, hasta, acumuladores=ACUMULADORES):
+    # Climatología de los años desde..hasta (inclusive) en tiempo constante
+    i = np.searchsorted(acumulado["anios"], desde, side="left")
+    j = np.searchsorted(acumulado["anios"], hasta, side="right")
+    return {
+        "variables": acumulado["variables"],
+        **{clave: acumulado[clave][:, j] - acumulado[clave][:, i] for clave in acumuladores},
+    }
+
+
+def _tabla(suma, n, etiquetas, todos=False):
+    # Misma forma que el antiguo groupby(...).unstack().T: horas en filas, periodos en columnas.
+    # Sólo se conservan los periodos con datos, salvo con todos=True (quedan en NaN)
+    con_datos = (n.sum(axis=1) > 0) | todos
+    return pd.DataFrame(
+        medias(suma, n)[con_datos].T,
+        index=ETIQUETAS_HORA,
+        columns=[e for e, c in zip(etiquetas, con_datos) if c],
+    )
+
+
+def tabla_mensual(clima, variable):
+    i = clima["variables"].index(variable)
+    # Siempre los 12 meses, aunque el rango de años elegido no cubra alguno
+    return _tabla(clima["suma_mes"][i], clima["n_mes"][i], ETIQUETAS_MES, todos=True)
+
+
+def tabla_diaria(clima, variable):
+    i = clima["variables"].index(variable)
+    return _tabla(clima["suma_dia"][i], clima["n_dia"][i], ETIQUETAS_DIA)
+
+
+def cubo_diario(clima, variable):
+    # Medias diarias como arreglo contiguo [mes, día, hora]; los días que no existen
+    # (30 de febrero, 31 de abril, ...) quedan en NaN
+    i = clima["variables"].index(variable)
+    cubo = np.full((MESES, 31, HORAS), np.nan)
+    cubo[MES_DE_DIA, DIA_DE_MES] = medias(clima["suma_dia"][i], clima["n_dia"][i])
+    return cubo
+
+
+def dias_por_mes(clima):
+    # Último día con datos de cada mes (29 en febrero sólo si hay datos del 29)
+    con_datos = np.zeros((MESES, 31), dtype=bool)
+    con_datos[MES_DE_DIA, DIA_DE_MES] = clima["n_dia"].sum(axis=(0, 2)) > 0
+    return np.where(con_datos.any(axis=1), 31 - np.argmax(con_datos[:, ::-1], axis=1), 0)
+
+
+def rango_por_mes(cubo):
+    # Mínimo y máximo de cada mes, forma (12, 2)
+    rango = np.full((MESES, 2), np.nan)
+    con_datos = ~np.isnan(cubo).all(axis=(1, 2))
+    rango[con_datos, 0] = np.nanmin(cubo[con_datos], axis=(1, 2))
+    rango[con_datos, 1] = np.nanmax(cubo[con_datos], axis=(1, 2))
+    return rango
+
+
+def tabla_mes(cubo, dias_mes, mes, horas, dias):
+    # Recorte (horas x días) de un mes como DataFrame sobre una vista del cubo, sin copiar
+    m = mes - 1
+    d0, d1 = max(dias[0] - 1, 0), min(dias[1], dias_mes[m])
+    h0, h1 = horas[0], horas[1] + 1
+    return pd.DataFrame(
+        cubo[m, d0:d1, h0:h1].T,
+        index=ETIQUETAS_HORA[h0:h1],
+        columns=[f"{mes:02d}-{d:02d}" for d in range(d0 + 1, d1 + 1)],
+        copy=False,
+    )
+
+
+def zona_confort(To):
+    # Modelo adaptativo ASHRAE 55 (2013) con 90 % de aceptación
+    T_confort = (0.31 * To.mean() + 17.8)
+
+    Zona_confort = pd.DataFrame()
+    Zona_confort['T_confort'] = T_confort
+    Zona_confort['T_exterior'] = To.mean()
+    Zona_confort['Lim_sup'] = T_confort + 2.5
+    Zona_confort['Lim_inf'] = T_confort - 2.5
+    return Zona_confort
+
+
+def media_exponencial(x, alfa=ALFA):
+    # Filtro recursivo y[n] = alfa * y[n-1] + (1 - alfa) * x[n-1], con y[0] = x[0].
+    # En lugar de recorrer los días se resuelve como un barrido en log2(n) pasos: en el paso s
+    # cada término recibe lo acumulado s posiciones atrás con peso alfa**s, y se termina en
+    # cuanto ese peso ya no cambia el resultado
+    y = np.empty(len(x))
+    if len(x) == 0:
+        return y
+    y[0] = x[0]
+    y[1:] = (1 - alfa) * x[:-1]
+    paso, peso = 1, alfa
+    while paso < len(y) and peso > np.finfo(float).eps:
+        y[paso:] = y[paso:] + peso * y[:-paso]
+        paso, peso = 2 * paso, peso * peso
+    return y
+
+
+def temperatura_prevaleciente(df, alfa=ALFA):
+    # Media móvil exponencial de las temperaturas medias diarias; los días sin datos se interpolan
+    diaria = df["Temp_Avg"].resample("D").mean().interpolate(limit_direction="both")
+    return pd.Series(media_exponencial(diaria.to_numpy(dtype="float64"), alfa), index=diaria.index)
+
+
+def confort_diario(df, alfa=ALFA):
+    # Sumas y conteos de la temperatura prevaleciente por año y día del calendario, con la misma
+    # forma (variables, años, ...) que las climatologías para reutilizar prefijos() y periodo()
+    t = temperatura_prevaleciente(df, alfa)
+    anios, anio = np.unique(t.index.year.to_numpy(dtype=np.int64), return_inverse=True)
+    _, dia, _ = claves(t.index)
+    suma, n = acumular(anio * DIAS + dia, t.to_numpy()[None, :], len(anios) * DIAS)
+    return {
+        "variables": ["T_prevaleciente"],
+        "anios": anios,
+        "suma_prevaleciente": suma.reshape(1, len(anios), DIAS),
+        "n_prevaleciente": n.reshape(1, len(anios), DIAS),
+    }
+
+
+def zona_confort_diaria(confort):
+    # Límites de confort de cada día del calendario a partir de la temperatura prevaleciente
+    T_prevaleciente = medias(confort["suma_prevaleciente"][0], confort["n_prevaleciente"][0])
+    T_confort = 0.31 * T_prevaleciente + 17.8
+    return pd.DataFrame({
+        "T_confort": T_confort,
+        "T_prevaleciente": T_prevaleciente,
+        "Lim_sup": T_confort + 2.5,
+        "Lim_inf": T_confort - 2.5,
+    }, index=ETIQUETAS_DIA)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from climatologia import (VARIABLES, HORAS, MESES, DIAS, MES_DE_DIA, DIA_DE_MES,
+                          ETIQUETAS_HORA, ETIQUETAS_MES, ETIQUETAS_DIA, claves)
+
+# Percentiles por (mes, hora) y (día, hora) sin guardar las muestras: cada celda lleva un
+# histograma de cubetas de ancho fijo. Los histogramas se combinan sumándolos, así que se
+# actualizan con las filas nuevas igual que las sumas de las medias. Se guardan sin comprimir
+# junto al cache de la estación. El percentil sigue la misma definición que
+# Series.quantile() (interpolación lineal entre las dos muestras ordenadas vecinas), con cada
+# muestra estimada dentro de su cubeta: la diferencia con el valor exacto es menor que el ancho
+# de una cubeta, también en las celdas diarias con pocas muestras.
+ESTADISTICOS = {
+    "media": "Promedio",
+    "p10": "Percentil 10",
+    "p50": "Mediana",
+    "p90": "Percentil 90",
+}
+CUANTILES = {"p10": 0.1, "p50": 0.5, "p90": 0.9}
+# (desde, hasta, ancho) de las cubetas de cada variable; los valores fuera se van a los extremos
+CUBETAS = {
+    "Temp_Avg": (-10, 50, 0.2),
+    "RH_Avg": (0, 100, 0.5),
+}
+
+
+def _n_cubetas(variable):
+    desde, hasta, ancho = CUBETAS[variable]
+    return int(round((hasta - desde) / ancho))
+
+
+def histogramas(df, variables=VARIABLES):
+    mes, dia, hora = claves(df.index)
+    resultado = {}
+    for v in variables:
+        desde, _, ancho = CUBETAS[v]
+        n = _n_cubetas(v)
+        x = df[v].to_numpy(dtype="float64")
+        validos = np.isfinite(x)
+        cubeta = np.clip(np.floor((x[validos] - desde) / ancho).astype(np.int64), 0, n - 1)
+        celda_mes = (mes[validos] * HORAS + hora[validos]) * n + cubeta
+        celda_dia = (dia[validos] * HORAS + hora[validos]) * n + cubeta
+        resultado[f"{v}_mes"] = np.bincount(celda_mes, minlength=MESES * HORAS * n).astype(np.int32).reshape(MESES, HORAS, n)
+        resultado[f"{v}_dia"] = np.bincount(celda_dia, minlength=DIAS * HORAS * n).astype(np.int32).reshape(DIAS, HORAS, n)
+    return resultado
+
+
+def combinar(a, b):
+    return {clave: a[clave] + b[clave] for clave in a}
+
+
+def _muestra(conteos, acumulado, r, desde, ancho):
+    # Valor estimado de la muestra r (0 es la menor) de cada celda: las muestras de una cubeta se
+    # reparten uniformemente dentro de ella
+    i = np.minimum((acumulado <= r[..., None]).sum(axis=-1), conteos.shape[-1] - 1)
+    previo = np.where(i > 0, np.take_along_axis(acumulado, np.maximum(i - 1, 0)[..., None], -1)[..., 0], 0)
+    en_cubeta = np.take_along_axis(conteos, i[..., None], -1)[..., 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return desde + ancho * (i + (r - previo + 0.5) / en_cubeta)
+
+
+def cuantil(conteos, variable, q):
+    # Percentil q de cada celda: posición q * (n - 1) entre las n muestras ordenadas
+    desde, _, ancho = CUBETAS[variable]
+    acumulado = np.cumsum(conteos, axis=-1)
+    total = acumulado[..., -1]
+    ultima = np.maximum(total - 1, 0)
+    posicion = q * ultima
+    abajo = np.floor(posicion)
+    v0 = _muestra(conteos, acumulado, abajo, desde, ancho)
+    v1 = _muestra(conteos, acumulado, np.minimum(abajo + 1, ultima), desde, ancho)
+    valor = v0 + (posicion - abajo) * (v1 - v0)
+    valor[total == 0] = np.nan
+    return valor
+
+
+def tablas(histograma, variable, q):
+    # Las mismas formas que las medias: tabla mensual (horas x 12 meses), tabla diaria
+    # (horas x días con datos) y cubo [mes, día, hora]
+    mensual = cuantil(histograma[f"{variable}_mes"], variable, q)
+    diario = cuantil(histograma[f"{variable}_dia"], variable, q)
+    con_datos = histograma[f"{variable}_dia"].sum(axis=(1, 2)) > 0
+    cubo = np.full((MESES, 31, HORAS), np.nan)
+    cubo[MES_DE_DIA, DIA_DE_MES] = diario
+    return {
+        "mensual": pd.DataFrame(mensual.T, index=ETIQUETAS_HORA, columns=ETIQUETAS_MES),
+        "diaria": pd.DataFrame(diario[con_datos].T, index=ETIQUETAS_HORA,
+                               columns=[e for e, c in zip(ETIQUETAS_DIA, con_datos) if c]),
+        "cubo": cubo,
+    }
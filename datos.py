@@ -0,0 +1,318 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+import calidad
+
+# Cache columnar de las estaciones: cada CSV se convierte una sola vez en arreglos .npy
+# (uno por columna más el índice de tiempo) que después se abren con memoria mapeada.
+# El cache se guarda junto al CSV en ".cache/<nombre>/" y se reconstruye cuando cambia
+# el archivo fuente (primero se compara mtime y tamaño, y sólo si difieren se calcula el hash).
+# Si el CSV sólo creció por el final, únicamente se leen las filas nuevas y se guardan como
+# un segmento más de cada columna.
+# Lo que se guarda es la serie ya depurada por calidad.py (malla regular, valores descartados,
+# huecos rellenos), con un arreglo de marcas por columna, así que la depuración se paga una vez.
+VERSION_CACHE = 4
+DIR_CACHE = ".cache"
+# Bytes del final del archivo con los que se comprueba que el contenido anterior no cambió
+COLA = 1 << 16
+# Pasado este número de segmentos se reconstruye el cache completo en un solo segmento
+MAX_SEGMENTOS = 32
+MAX_HISTORIAL = 64
+
+
+def ruta_cache(ruta):
+    carpeta, archivo = os.path.split(os.path.abspath(ruta))
+    return os.path.join(carpeta, DIR_CACHE, os.path.splitext(archivo)[0])
+
+
+def huella(ruta, bloque=1 << 20):
+    h = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _cola(f, tamano):
+    inicio = max(0, tamano - COLA)
+    f.seek(inicio)
+    return hashlib.sha1(f.read(tamano - inicio)).hexdigest()
+
+
+def leer_csv(ruta):
+    return pd.read_csv(ruta, index_col=0, parse_dates=True)
+
+
+def _sufijo():
+    # Los archivos temporales llevan proceso e hilo: la ingesta y las sesiones pueden escribir la
+    # misma estación a la vez dentro de un proceso
+    return f"{os.getpid()}.{threading.get_ident()}"
+
+
+def _leer_meta(dir_cache):
+    try:
+        with open(os.path.join(dir_cache, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != VERSION_CACHE or meta.get("calidad") != calidad.CONFIGURACION:
+        return None
+    return meta
+
+
+def _escribir_meta(dir_cache, meta):
+    # Escritura atómica: meta.json es la marca de que el cache está completo
+    tmp = os.path.join(dir_cache, f"meta.json.{_sufijo()}")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(dir_cache, "meta.json"))
+
+
+def _guardar_arreglo(carpeta, nombre, arreglo):
+    tmp = os.path.join(carpeta, f"{nombre}.{_sufijo()}.npy")
+    np.save(tmp, arreglo)
+    os.replace(tmp, os.path.join(carpeta, f"{nombre}.npy"))
+
+
+def _nombre_segmento(nombre, k):
+    return nombre if k == 0 else f"{nombre}.{k}"
+
+
+def _guardar_segmento(carpeta, k, df, columnas):
+    _guardar_arreglo(carpeta, _nombre_segmento("indice", k), df.index.values.view("int64"))
+    for i, nombre in enumerate(columnas):
+        _guardar_arreglo(carpeta, _nombre_segmento(f"c{i}", k), df[nombre].to_numpy(dtype="float64"))
+        _guardar_arreglo(carpeta, _nombre_segmento(f"m{i}", k), df[calidad.columna_marca(nombre)].to_numpy(dtype=np.int8))
+
+
+def _cargar(carpeta, nombre, segmentos):
+    partes = [np.load(os.path.join(carpeta, f"{_nombre_segmento(nombre, k)}.npy"), mmap_mode="r")
+              for k in range(segmentos)]
+    # Con un solo segmento el arreglo queda mapeado; con varios se concatenan en memoria
+    return partes[0] if len(partes) == 1 else np.concatenate(partes)
+
+
+def _leer_version(dir_cache, meta):
+    carpeta = os.path.join(dir_cache, meta["carpeta"])
+    try:
+        tiempo = _cargar(carpeta, "indice", meta["segmentos"])
+        columnas = {
+            nombre: _cargar(carpeta, f"c{i}", meta["segmentos"])
+            for i, nombre in enumerate(meta["columnas"])
+        }
+        columnas.update({
+            calidad.columna_marca(nombre): _cargar(carpeta, f"m{i}", meta["segmentos"])
+            for i, nombre in enumerate(meta["columnas"])
+        })
+    except (OSError, ValueError):
+        return None
+    indice = pd.DatetimeIndex(tiempo.view("datetime64[ns]"), name=meta["nombre_indice"])
+    df = pd.DataFrame(columnas, index=indice)
+    df.attrs["huella"] = meta["huella"]
+    df.attrs["historial"] = meta["historial"]
+    return df
+
+
+def construir_cache(ruta, h=None):
+    stat = os.stat(ruta)
+    h = h or huella(ruta)
+    crudo = leer_csv(ruta)
+    columnas = list(crudo.columns)
+    paso = calidad.frecuencia(crudo.index)
+    df = calidad.depurar(crudo, paso)
+    del crudo
+    df.attrs["huella"] = h
+    df.attrs["historial"] = [[h, len(df)]]
+
+    dir_cache = ruta_cache(ruta)
+    version = h[:16]
+    try:
+        carpeta = os.path.join(dir_cache, version)
+        os.makedirs(carpeta, exist_ok=True)
+        _guardar_segmento(carpeta, 0, df, columnas)
+        with open(ruta, "rb") as f:
+            cola = _cola(f, stat.st_size)
+        _escribir_meta(dir_cache, {
+            "version": VERSION_CACHE,
+            "huella": h,
+            "carpeta": version,
+            "segmentos": 1,
+            "mtime_ns": stat.st_mtime_ns,
+            "tamano": stat.st_size,
+            "cola": cola,
+            "nombre_indice": df.index.name,
+            "columnas": columnas,
+            "paso_ns": paso.value,
+            "calidad": calidad.CONFIGURACION,
+            "filas": len(df),
+            "historial": df.attrs["historial"],
+        })
+    except OSError:
+        # Si la carpeta de datos es de sólo lectura se trabaja sin cache
+        return df
+
+    # Borrar versiones anteriores y los resultados derivados de ellas; los procesos que aún
+    # las tengan mapeadas no se ven afectados
+    for nombre in os.listdir(dir_cache):
+        anterior = os.path.join(dir_cache, nombre)
+        if nombre not in (version, "meta.json") and not nombre.startswith("meta.json."):
+            if os.path.isdir(anterior):
+                shutil.rmtree(anterior, ignore_errors=True)
+            else:
+                try:
+                    os.remove(anterior)
+                except OSError:
+                    pass
+    return df
+
+
+def _previo(dir_cache, meta):
+    # Últimas filas depuradas del último segmento, vecindad de la depuración de las filas nuevas
+    carpeta = os.path.join(dir_cache, meta["carpeta"])
+    k = meta["segmentos"] - 1
+    try:
+        tiempo = np.load(os.path.join(carpeta, f"{_nombre_segmento('indice', k)}.npy"), mmap_mode="r")
+        columnas = {
+            nombre: np.load(os.path.join(carpeta, f"{_nombre_segmento(f'c{i}', k)}.npy"),
+                            mmap_mode="r")[-calidad.CONTEXTO:]
+            for i, nombre in enumerate(meta["columnas"])
+        }
+    except (OSError, ValueError):
+        return None
+    indice = pd.DatetimeIndex(np.asarray(tiempo[-calidad.CONTEXTO:]).view("datetime64[ns]"))
+    return pd.DataFrame(columnas, index=indice)
+
+
+def _anexar(ruta, dir_cache, meta, stat):
+    # Devuelve None si el CSV no sólo creció por el final (entonces hay que reconstruir)
+    if stat.st_size <= meta["tamano"] or meta["segmentos"] >= MAX_SEGMENTOS:
+        return None
+    with open(ruta, "rb") as f:
+        if _cola(f, meta["tamano"]) != meta["cola"]:
+            return None
+        f.seek(meta["tamano"] - 1)
+        if f.read(1) != b"\n":
+            return None
+        nuevos = f.read(stat.st_size - meta["tamano"])
+        # Una última línea sin salto puede estar a medio escribir; se deja para la próxima vez
+        nuevos = nuevos[:nuevos.rfind(b"\n") + 1]
+        completo = meta["tamano"] + len(nuevos) == stat.st_size
+        if nuevos:
+            cola = _cola(f, meta["tamano"] + len(nuevos))
+
+    if nuevos:
+        df = pd.read_csv(io.BytesIO(nuevos), header=None, names=[meta["nombre_indice"]] + meta["columnas"],
+                         index_col=0, parse_dates=True)
+        # Las filas nuevas siguen la malla del cache; las que caen antes de su último registro se
+        # ignoran porque no se puede insertar en medio de los segmentos guardados
+        previo = _previo(dir_cache, meta)
+        if previo is None or len(previo) == 0:
+            return None
+        df = calidad.depurar(df, pd.Timedelta(meta["paso_ns"], unit="ns"), previo)
+        h = hashlib.sha1((meta["huella"] + hashlib.sha1(nuevos).hexdigest()).encode()).hexdigest()
+        try:
+            _guardar_segmento(os.path.join(dir_cache, meta["carpeta"]), meta["segmentos"], df, meta["columnas"])
+        except OSError:
+            return None
+        meta.update(
+            huella=h,
+            segmentos=meta["segmentos"] + 1,
+            tamano=meta["tamano"] + len(nuevos),
+            cola=cola,
+            filas=meta["filas"] + len(df),
+            historial=(meta["historial"] + [[h, meta["filas"] + len(df)]])[-MAX_HISTORIAL:],
+        )
+    # Sin mtime se vuelve a revisar el final del archivo en la siguiente carga
+    meta["mtime_ns"] = stat.st_mtime_ns if completo else None
+    try:
+        _escribir_meta(dir_cache, meta)
+    except OSError:
+        return None
+    return _leer_version(dir_cache, meta)
+
+
+def cargar_estacion(ruta):
+    dir_cache = ruta_cache(ruta)
+    meta = _leer_meta(dir_cache)
+    if meta is None:
+        return construir_cache(ruta)
+
+    stat = os.stat(ruta)
+    if (meta["mtime_ns"], meta["tamano"]) != (stat.st_mtime_ns, stat.st_size):
+        df = _anexar(ruta, dir_cache, meta, stat)
+        if df is not None:
+            return df
+        h = huella(ruta)
+        if h != meta["huella"]:
+            return construir_cache(ruta, h)
+        # Mismo contenido con otra fecha de modificación: sólo se actualiza meta.json
+        meta.update(mtime_ns=stat.st_mtime_ns, tamano=stat.st_size)
+        try:
+            _escribir_meta(dir_cache, meta)
+        except OSError:
+            pass
+
+    df = _leer_version(dir_cache, meta)
+    if df is None:
+        return construir_cache(ruta)
+    return df
+
+
+def firma(ruta):
+    stat = os.stat(ruta)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def huella_vigente(ruta):
+    # Huella del cache si el CSV no cambió desde que se construyó (None si hay que revisarlo);
+    # permite usar los resultados derivados sin abrir la serie
+    meta = _leer_meta(ruta_cache(ruta))
+    if meta is None or (meta["mtime_ns"], meta["tamano"]) != firma(ruta):
+        return None
+    return meta["huella"]
+
+
+def guardar_derivado(ruta, nombre, arreglos, h):
+    # Resultados calculados a partir de la estación (acumuladores, climatologías, ...) que se
+    # guardan junto a su cache, marcados con la huella de los datos de origen. Cada resultado es
+    # una carpeta con un .npy por arreglo para poder abrirlos con memoria mapeada
+    destino = os.path.join(ruta_cache(ruta), nombre)
+    tmp = f"{destino}.{_sufijo()}.tmp"
+    anterior = f"{destino}.{_sufijo()}.anterior"
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for clave, arreglo in arreglos.items():
+            np.save(os.path.join(tmp, f"{clave}.npy"), np.asarray(arreglo))
+        with open(os.path.join(tmp, "huella"), "w") as f:
+            f.write(h)
+        if os.path.isdir(destino):
+            os.rename(destino, anterior)
+        os.rename(tmp, destino)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # Los procesos que tengan mapeada la versión anterior la siguen viendo hasta soltarla
+    shutil.rmtree(anterior, ignore_errors=True)
+
+
+def cargar_derivado(ruta, nombre):
+    # Los arreglos se abren de sólo lectura y con memoria mapeada: todos los procesos del equipo
+    # comparten las mismas páginas en lugar de tener cada uno su copia
+    carpeta = os.path.join(ruta_cache(ruta), nombre)
+    try:
+        with open(os.path.join(carpeta, "huella")) as f:
+            h = f.read()
+        arreglos = {
+            archivo[:-4]: np.load(os.path.join(carpeta, archivo), mmap_mode="r")
+            for archivo in os.listdir(carpeta) if archivo.endswith(".npy")
+        }
+    except (OSError, ValueError):
+        return None, None
+    return arreglos, h
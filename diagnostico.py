@@ -0,0 +1,47 @@
+import hmac
+import os
+from urllib.parse import parse_qs
+
+import arranque
+import estaciones
+import metricas
+import trabajadores
+from cache_render import cache
+
+# Diagnóstico del proceso: las métricas de metricas.py más el estado del cache de imágenes, la
+# memoria, las estaciones y el arranque. El panel de diagnóstico de la app sólo aparece si la URL
+# trae ?admin=<ECOVENT_ADMIN_TOKEN>; sin esa variable no aparece nunca. /metrics (servidor.py)
+# entrega lo mismo en formato de Prometheus.
+TOKEN = os.environ.get("ECOVENT_ADMIN_TOKEN")
+
+
+def es_admin(busqueda):
+    if not TOKEN:
+        return False
+    # compare_digest sólo admite str ASCII: se comparan los bytes para que ?admin=ñ se rechace sin error
+    return any(hmac.compare_digest(valor.encode(), TOKEN.encode())
+               for valor in parse_qs(busqueda.lstrip("?")).get("admin", []))
+
+
+def indicadores():
+    # (nombre, tipo, ayuda, valor) calculados al momento de consultarlos
+    imagenes = cache.estadisticas()
+    memoria = metricas.memoria()
+    return [
+        ("ecovent_cache_render_aciertos_total", "counter", "Imágenes servidas desde memoria", imagenes["aciertos"]),
+        ("ecovent_cache_render_aciertos_disco_total", "counter", "Imágenes servidas desde disco",
+         imagenes["aciertos_disco"]),
+        ("ecovent_cache_render_fallos_total", "counter", "Imágenes que hubo que dibujar", imagenes["fallos"]),
+        ("ecovent_cache_render_imagenes", "gauge", "Imágenes en memoria", imagenes["imagenes"]),
+        ("ecovent_cache_render_bytes", "gauge", "Bytes de imágenes en memoria", imagenes["bytes"]),
+        ("ecovent_cache_render_disco_bytes", "gauge", "Bytes de imágenes en disco", imagenes["bytes_disco"]),
+        ("ecovent_memoria_residente_bytes", "gauge", "Memoria residente del proceso", memoria["residente_bytes"]),
+        ("ecovent_memoria_pico_bytes", "gauge", "Pico de memoria residente del proceso", memoria["pico_bytes"]),
+        ("ecovent_estaciones_cargadas", "gauge", "Estaciones en memoria", len(estaciones.cargadas())),
+        ("ecovent_trabajadores", "gauge", "Procesos para dibujar", trabajadores.N_TRABAJADORES),
+        ("ecovent_listo", "gauge", "1 cuando terminó el arranque", int(arranque.listo())),
+    ]
+
+
+def prometheus():
+    return metricas.prometheus(indicadores())
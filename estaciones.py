@@ -0,0 +1,359 @@
+import glob
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from datos import cargar_estacion, firma, huella_vigente, guardar_derivado, cargar_derivado
+import calidad as control_calidad
+from climatologia import (VARIABLES, ACUMULADORES, ACUMULADORES_CONFORT, climatologia, sumar, prefijos, periodo,
+                          tabla_mensual, tabla_diaria, zona_confort, cubo_diario, dias_por_mes, rango_por_mes,
+                          confort_diario, zona_confort_diaria)
+from clasificacion import conteos
+from viento import histogramas
+from psicrometria import VARIABLES as VARIABLES_PSICRO, propiedades
+from cuantiles import CUANTILES, histogramas as histogramas_cuantiles, combinar, tablas
+from metricas import medir
+
+# Registro de estaciones: descubre los CSV de data/ y carga cada estación (datos y
+# climatologías) sólo la primera vez que alguna sesión la selecciona. Las estaciones
+# cargadas se comparten entre sesiones del mismo proceso en un LRU acotado.
+# En memoria sólo quedan las sumas acumuladas por año (mapeadas de solo lectura desde el cache,
+# compartidas por todos los procesos) y las tablas pequeñas; la serie completa se suelta en
+# cuanto existen los agregados y se vuelve a abrir sólo si algún cálculo la necesita.
+DIR_DATOS = "./data"
+MAX_ESTACIONES = int(os.environ.get("ECOVENT_MAX_ESTACIONES", 4))
+# Rangos de años distintos al completo que se guardan por estación
+MAX_PERIODOS = 8
+
+NOMBRES = {
+    "R-U-O-A_completo": "Temixco",
+}
+# Altitud de cada estación [m], para la presión atmosférica de los cálculos psicrométricos
+ALTITUDES = {
+    "R-U-O-A_completo": 1280,
+}
+
+_cargadas = OrderedDict()
+_candado = threading.Lock()
+# Un candado por estación para no prepararla dos veces a la vez
+_preparando = defaultdict(threading.Lock)
+# Aumenta cada vez que se recarga alguna estación; _versiones lleva la cuenta de cada estación
+# para que las sesiones (con reactive.poll) sólo reaccionen a la que tienen elegida
+_cambios = 0
+_versiones = {}
+
+# Grupos de sumas acumuladas que se guardan juntos en "agregados": (variables, acumuladores)
+GRUPOS = {
+    "clima": (VARIABLES, ACUMULADORES),
+    "confort": (("T_prevaleciente",), ACUMULADORES_CONFORT),
+    "psicro": (VARIABLES_PSICRO, ACUMULADORES),
+}
+CLAVES_AGREGADOS = {f"{g}.{c}" for g, (_, acumuladores) in GRUPOS.items() for c in ("anios",) + acumuladores}
+
+
+def disponibles():
+    rutas = sorted(glob.glob(os.path.join(DIR_DATOS, "*.csv")))
+    return {ruta: nombre(ruta) for ruta in rutas}
+
+
+def nombre(ruta):
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    return NOMBRES.get(base, base)
+
+
+def altitud(ruta):
+    return ALTITUDES.get(os.path.splitext(os.path.basename(ruta))[0], 0)
+
+
+def _acumulado(ruta, h, serie, nombre, calcular, combinar, compatible):
+    # Acumuladores (sumas, conteos, histogramas) guardados junto al cache de la estación. Si desde
+    # entonces sólo se agregaron filas al final del CSV, basta con acumular las filas nuevas.
+    # `serie` devuelve el DataFrame de la estación; sólo se llama si hay que calcular algo
+    guardado, h_guardado = cargar_derivado(ruta, nombre)
+    if guardado is not None and compatible(guardado):
+        if h_guardado == h:
+            return guardado
+        df = serie()
+        filas = dict(df.attrs.get("historial", [])).get(h_guardado)
+        acumulado = calcular(df) if filas is None else combinar(guardado, calcular(df.iloc[filas:]))
+    else:
+        acumulado = calcular(serie())
+    if h is not None:
+        guardar_derivado(ruta, nombre, acumulado, h)
+    return acumulado
+
+
+def _climatologia(ruta, RUOA, nombre="climatologia", variables=VARIABLES):
+    def compatible(guardada):
+        if "anios" not in guardada or guardada["variables"].tolist() != list(variables):
+            return False
+        guardada["variables"] = list(variables)
+        return True
+
+    return _acumulado(ruta, RUOA.attrs.get("huella"), lambda: RUOA, nombre,
+                      lambda df: climatologia(df, variables), sumar, compatible)
+
+
+def _derivado(ruta, nombre, h, calcular):
+    # Resultado guardado junto al cache de la estación; se recalcula si los datos cambiaron
+    guardado, h_guardado = cargar_derivado(ruta, nombre)
+    if guardado is None or h_guardado != h:
+        guardado = calcular()
+        if h is not None:
+            guardar_derivado(ruta, nombre, guardado, h)
+    return guardado
+
+
+def resumen(clima, confort, psicro):
+    # Tablas y arreglos que usa la app a partir de una climatología (de todos los años o de un rango)
+    To = tabla_mensual(clima, "Temp_Avg")
+    To_cubo = cubo_diario(clima, "Temp_Avg")
+    HR_cubo = cubo_diario(clima, "RH_Avg")
+    return {
+        "To": To,
+        "To_diario": tabla_diaria(clima, "Temp_Avg"),
+        "HR": tabla_mensual(clima, "RH_Avg"),
+        "HR_diario": tabla_diaria(clima, "RH_Avg"),
+        "Zona_confort": zona_confort(To),
+        "Zona_confort_diaria": zona_confort_diaria(confort),
+        "To_cubo": To_cubo,
+        "HR_cubo": HR_cubo,
+        "dias_mes": dias_por_mes(clima),
+        "To_rango_mes": rango_por_mes(To_cubo),
+        "HR_rango_mes": rango_por_mes(HR_cubo),
+        "psicrometria": {v: tabla_mensual(psicro, v) for v in VARIABLES_PSICRO},
+        "psicrometria_cubo": {v: cubo_diario(psicro, v) for v in VARIABLES_PSICRO},
+    }
+
+
+def _serie(d):
+    # La serie completa no se guarda con la estación: se vuelve a abrir desde su cache
+    # Abrirla puede anexar filas nuevas al cache: se hace con el candado de la estación
+    with medir("ecovent_carga_segundos", etapa="serie"), _preparando[d["ruta"]]:
+        return cargar_estacion(d["ruta"])
+
+
+def _agregar(ruta, RUOA):
+    # Sumas acumuladas por año de las climatologías de temperatura y HR, de la temperatura
+    # prevaleciente y de las propiedades psicrométricas, en un solo diccionario de arreglos
+    h = RUOA.attrs.get("huella")
+    clima = _climatologia(ruta, RUOA)
+    # La temperatura prevaleciente depende de toda la serie anterior: se recalcula completa
+    confort = confort_diario(RUOA)
+    # Columnas psicrométricas (mismas filas que RUOA) y sus climatologías, que se acumulan igual
+    # que las de temperatura y humedad
+    psicro = _derivado(ruta, "propiedades", h,
+                       lambda: {c: v.to_numpy() for c, v in propiedades(RUOA, altitud(ruta)).items()})
+    psicro = pd.DataFrame(psicro, index=RUOA.index)
+    psicro.attrs = RUOA.attrs
+    clima_psicro = _climatologia(ruta, psicro, "climatologia_psicrometrica", VARIABLES_PSICRO)
+
+    agregados = {}
+    for grupo, acumulado in (("clima", clima), ("confort", confort), ("psicro", clima_psicro)):
+        _, acumuladores = GRUPOS[grupo]
+        agregados[f"{grupo}.anios"] = acumulado["anios"]
+        for clave, arreglo in prefijos(acumulado, acumuladores).items():
+            if clave in acumuladores:
+                # Los conteos caben en int32; las sumas quedan en float64 porque los rangos de
+                # años se obtienen restando sumas acumuladas
+                agregados[f"{grupo}.{clave}"] = arreglo.astype(np.int32) if clave.startswith("n_") else arreglo
+    return agregados
+
+
+def _prefijos(d, grupo):
+    variables, acumuladores = GRUPOS[grupo]
+    return {
+        "variables": list(variables),
+        "anios": d["agregados"][f"{grupo}.anios"],
+        **{clave: d["agregados"][f"{grupo}.{clave}"] for clave in acumuladores},
+    }
+
+
+def _resumen_anios(d, desde, hasta):
+    with medir("ecovent_carga_segundos", etapa="resumen"):
+        return resumen(periodo(_prefijos(d, "clima"), desde, hasta),
+                       periodo(_prefijos(d, "confort"), desde, hasta, ACUMULADORES_CONFORT),
+                       periodo(_prefijos(d, "psicro"), desde, hasta))
+
+
+def preparar(ruta):
+    estado = firma(ruta)
+    h = huella_vigente(ruta)
+    agregados, h_agregados = cargar_derivado(ruta, "agregados")
+    if h is None or h_agregados != h or set(agregados) != CLAVES_AGREGADOS:
+        with medir("ecovent_carga_segundos", etapa="cargar_estacion"):
+            RUOA = cargar_estacion(ruta)
+        h = RUOA.attrs.get("huella")
+        with medir("ecovent_carga_segundos", etapa="agregar"):
+            agregados = _agregar(ruta, RUOA)
+        if h is not None:
+            guardar_derivado(ruta, "agregados", agregados, h)
+            # A partir de aquí se usan los arreglos mapeados desde el cache
+            agregados = cargar_derivado(ruta, "agregados")[0] or agregados
+        del RUOA
+    anios = agregados["clima.anios"]
+    d = {
+        "ruta": ruta,
+        "nombre": nombre(ruta),
+        "version": h,
+        "firma": estado,
+        "agregados": agregados,
+        "anios": (int(anios[0]), int(anios[-1])),
+        "periodos": OrderedDict(),
+    }
+    d.update(_resumen_anios(d, *d["anios"]))
+    return d
+
+
+def seleccion(d, anios):
+    # Resumen de la estación para un rango de años; el rango completo es la propia estación
+    anios = (max(int(anios[0]), d["anios"][0]), min(int(anios[1]), d["anios"][1]))
+    if anios == d["anios"]:
+        return d
+    with _candado:
+        if anios in d["periodos"]:
+            d["periodos"].move_to_end(anios)
+            return d["periodos"][anios]
+    sel = {
+        "ruta": d["ruta"],
+        "nombre": d["nombre"],
+        "version": d["version"],
+        "anios": anios,
+        **_resumen_anios(d, *anios),
+    }
+    with _candado:
+        d["periodos"][anios] = sel
+        while len(d["periodos"]) > MAX_PERIODOS:
+            d["periodos"].popitem(last=False)
+    return sel
+
+
+def ventilacion(d):
+    # Conteos de horas por clase (frío/confort/calor x seco/adecuado/húmedo) de la estación completa.
+    # Se calculan la primera vez que se piden y se guardan junto al cache de la estación
+    if "ventilacion" not in d:
+        with medir("ecovent_carga_segundos", etapa="ventilacion"):
+            d["ventilacion"] = _derivado(d["ruta"], "ventilacion", d["version"],
+                                         lambda: conteos(_serie(d), d["Zona_confort"]))
+    return d["ventilacion"]
+
+
+def viento(d):
+    # Histogramas de dirección y velocidad del viento por mes y hora de la estación completa
+    if "viento" not in d:
+        with medir("ecovent_carga_segundos", etapa="viento"):
+            d["viento"] = _derivado(d["ruta"], "viento", d["version"], lambda: histogramas(_serie(d)))
+    return d["viento"]
+
+
+def percentiles(d):
+    # Tablas de percentiles de temperatura y HR de todos los años, a partir de los histogramas por
+    # celda; los histogramas se guardan y se actualizan con las filas nuevas
+    if "percentiles" not in d:
+        claves = {f"{v}_{p}" for v in VARIABLES for p in ("mes", "dia")}
+        with medir("ecovent_carga_segundos", etapa="percentiles"):
+            histograma = _acumulado(d["ruta"], d["version"], lambda: _serie(d), "histogramas", histogramas_cuantiles,
+                                    combinar, lambda guardado: set(guardado) == claves)
+            d["percentiles"] = {
+                (v, nombre): tablas(histograma, v, q) for v in VARIABLES for nombre, q in CUANTILES.items()
+            }
+    return d["percentiles"]
+
+
+def calidad(d):
+    # Valores válidos, faltantes, descartados y rellenados por año, mes y hora de la estación
+    # completa, a partir de las marcas que dejó la depuración al construir el cache
+    if "calidad" not in d:
+        claves = {"variables", "anios", *control_calidad.ACUMULADORES}
+        with medir("ecovent_carga_segundos", etapa="calidad"):
+            d["calidad"] = _acumulado(d["ruta"], d["version"], lambda: _serie(d), "calidad", control_calidad.conteos,
+                                      lambda a, b: sumar(a, b, control_calidad.ACUMULADORES),
+                                      lambda guardado: set(guardado) == claves)
+    return d["calidad"]
+
+
+# Resultados de la estación completa que necesitan la serie la primera vez (o cuando cambian los
+# datos). Se calculan en segundo plano (arranque.pedir, revisar) para no detener el ciclo de
+# eventos; la app los pide con calculado() y mientras tanto espera
+DERIVADOS = {
+    "ventilacion": ventilacion,
+    "viento": viento,
+    "percentiles": percentiles,
+    "calidad": calidad,
+}
+
+
+def calculado(d, nombre):
+    return nombre in d
+
+
+def derivados(d):
+    for fn in DERIVADOS.values():
+        fn(d)
+    return d
+
+
+def cargada(ruta):
+    # La estación si ya está en memoria; None si hay que prepararla
+    with _candado:
+        if ruta in _cargadas:
+            _cargadas.move_to_end(ruta)
+            return _cargadas[ruta]
+    return None
+
+
+def cargadas():
+    with _candado:
+        return list(_cargadas)
+
+
+def estacion(ruta):
+    if ruta not in disponibles():
+        raise KeyError(f"Estación desconocida: {ruta}")
+    datos = cargada(ruta)
+    if datos is not None:
+        return datos
+    # Se prepara fuera del candado para que preparar una estación no detenga a quien sólo
+    # consulta las que ya están en memoria
+    with _preparando[ruta]:
+        datos = cargada(ruta)
+        if datos is None:
+            datos = preparar(ruta)
+            with _candado:
+                _cargadas[ruta] = datos
+                while len(_cargadas) > MAX_ESTACIONES:
+                    _cargadas.popitem(last=False)
+    return datos
+
+
+def cambios():
+    return _cambios
+
+
+def versiones():
+    with _candado:
+        return dict(_versiones)
+
+
+def revisar():
+    # Recarga las estaciones en memoria cuyo CSV cambió (por ejemplo, filas agregadas por ingesta.py)
+    global _cambios
+    with _candado:
+        pendientes = [ruta for ruta, d in _cargadas.items()
+                      if os.path.exists(ruta) and firma(ruta) != d["firma"]]
+    for ruta in pendientes:
+        # Con el mismo candado que estacion(): una sesión no puede estar preparando o anexando a la
+        # misma estación mientras tanto
+        with _preparando[ruta]:
+            datos = preparar(ruta)
+        # Las sesiones reciben la estación nueva con todo calculado
+        derivados(datos)
+        with _candado:
+            if ruta in _cargadas:
+                _cargadas[ruta] = datos
+            _cambios += 1
+            _versiones[ruta] = _versiones.get(ruta, 0) + 1
+    return pendientes
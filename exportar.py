@@ -0,0 +1,117 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import estaciones
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Exportación de las tablas de una estación (las mismas que dibuja la app) para otras
+# herramientas: CSV, Parquet o Arrow IPC de un rango de años, horas y meses. Las tablas salen de
+# estaciones.seleccion, que ya las tiene calculadas (o en su cache de periodos), así que exportar
+# no vuelve a leer ni agregar la serie. La ETag depende sólo de la versión de los datos y del
+# corte pedido, de modo que servidor.py puede responder 304 sin armar la tabla; los últimos
+# archivos generados se guardan para las descargas repetidas sin If-None-Match.
+TABLAS = ("To", "HR", "To_diario", "HR_diario", "Zona_confort")
+# formato: (tipo MIME, extensión); Parquet y Arrow necesitan pyarrow, que es opcional
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+ETIQUETAS = {"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow IPC"}
+HORAS = (0, 23)
+MESES = (1, 12)
+MAX_ARCHIVOS = 32
+
+_archivos = OrderedDict()
+_candado = threading.Lock()
+
+
+def disponible(formato):
+    return formato == "csv" or (formato in FORMATOS and pyarrow is not None)
+
+
+def disponibles():
+    # Formatos que se pueden generar con las bibliotecas instaladas
+    return {f: ETIQUETAS[f] for f in FORMATOS if disponible(f)}
+
+
+def ruta(estacion):
+    # Estación por el nombre de su CSV sin extensión (R-U-O-A_completo); None si no existe
+    for r in estaciones.disponibles():
+        if os.path.splitext(os.path.basename(r))[0] == estacion:
+            return r
+    return None
+
+
+def rango(texto, por_defecto, minimo, maximo):
+    # "2016-2020" o "7" -> (desde, hasta); ValueError si no es un rango válido
+    if not texto:
+        return por_defecto
+    desde, _, hasta = texto.partition("-")
+    desde, hasta = int(desde), int(hasta or desde)
+    if not minimo <= desde <= hasta <= maximo:
+        raise ValueError(f"rango fuera de {minimo}-{maximo}: {texto}")
+    return desde, hasta
+
+
+def _cortar(tabla, nombre, horas, meses):
+    if nombre == "Zona_confort":
+        return tabla.iloc[meses[0]-1:meses[1]].rename_axis("mes").reset_index()
+    tabla = tabla.iloc[horas[0]:horas[1]+1]
+    if nombre.endswith("_diario"):
+        # Columnas "MM-DD"
+        columnas = [c for c in tabla.columns if meses[0] <= int(c[:2]) <= meses[1]]
+    else:
+        columnas = tabla.columns[meses[0]-1:meses[1]]
+    return tabla[columnas].rename_axis("hora").reset_index()
+
+
+def etag(d, nombre, anios, horas, meses, formato):
+    anios = (max(anios[0], d["anios"][0]), min(anios[1], d["anios"][1]))
+    corte = repr((d["ruta"], d["version"], nombre, anios, horas, meses, formato))
+    return '"' + hashlib.sha1(corte.encode()).hexdigest() + '"'
+
+
+def codificar(tabla, formato):
+    if formato == "csv":
+        return tabla.to_csv(index=False).encode()
+    if not disponible(formato):
+        raise ValueError(f"el formato {formato} necesita pyarrow")
+    if formato == "parquet":
+        buffer = io.BytesIO()
+        pyarrow.parquet.write_table(pyarrow.Table.from_pandas(tabla, preserve_index=False), buffer)
+        return buffer.getvalue()
+    buffer = pyarrow.BufferOutputStream()
+    arrow = pyarrow.Table.from_pandas(tabla, preserve_index=False)
+    with pyarrow.ipc.new_file(buffer, arrow.schema) as escritor:
+        escritor.write_table(arrow)
+    return buffer.getvalue().to_pybytes()
+
+
+def exportar(d, nombre, anios, horas=HORAS, meses=MESES, formato="csv"):
+    # (bytes, etag) de la tabla `nombre` de la estación ya preparada `d`
+    clave = etag(d, nombre, anios, horas, meses, formato)
+    with _candado:
+        if clave in _archivos:
+            _archivos.move_to_end(clave)
+            return _archivos[clave], clave
+    contenido = codificar(_cortar(estaciones.seleccion(d, anios)[nombre], nombre, horas, meses), formato)
+    with _candado:
+        _archivos[clave] = contenido
+        while len(_archivos) > MAX_ARCHIVOS:
+            _archivos.popitem(last=False)
+    return contenido, clave
+
+
+def nombre_archivo(d, nombre, anios, formato):
+    estacion = os.path.splitext(os.path.basename(d["ruta"]))[0]
+    return f"{estacion}_{nombre}_{anios[0]}-{anios[1]}.{FORMATOS[formato][1]}"
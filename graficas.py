@@ -0,0 +1,137 @@
+import io
+import time
+
+import numpy as np
+
+# Construcción de las figuras de la app. Las funciones sólo reciben tablas y números, no
+# dependen de Shiny, y devuelven la imagen ya codificada en PNG para poder guardarla en cache.
+# matplotlib y seaborn tardan en importarse y el proceso de la app no dibuja (lo hacen los
+# trabajadores), así que se cargan con la primera figura y no al importar este módulo.
+meses = ['Ene.', 'Feb.', 'Mar.', 'Abr.', 'May.', 'Jun.', 'Jul.', 'Ago.', 'Sep.', 'Oct.', 'Nov.', 'Dic.']
+FIGSIZE = (10, 6)
+DPI = 96
+
+
+plt = sbn = ticker = None
+# Segundos acumulados en savefig (rasterizar la figura y codificar el PNG); trabajadores.py lo
+# usa para separar ese tiempo del de armar la figura
+tiempo_png = 0.0
+
+
+def cargar():
+    global plt, sbn, ticker
+    if plt is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot
+        import matplotlib.ticker
+        import seaborn
+        plt, sbn, ticker = matplotlib.pyplot, seaborn, matplotlib.ticker
+
+
+def codificar(fig, formato="png"):
+    # PNG para la app; los reportes (reportes.py) también piden PDF
+    global tiempo_png
+    t = time.perf_counter()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=formato, dpi=DPI, bbox_inches="tight")
+    plt.close(fig)
+    tiempo_png += time.perf_counter() - t
+    return buffer.getvalue()
+
+
+def ticks(desde, hasta, delta):
+    # Generar ticks intermedios con np.arange y agregar los límites inferior y superior
+    ticks_intermedios = np.arange(desde, hasta, delta)  # Valores intermedios
+    ticks_completos = np.concatenate(([desde], ticks_intermedios, [hasta]))  # Incluyendo límites
+
+    # Redondear los valores de la lista al primer decimal
+    return [round(float(val), 1) for val in ticks_completos]
+
+
+def grafica_zona_confort(Zona_confort, formato="png"):
+    cargar()
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+
+    # Gráfica principal
+    ax.plot(Zona_confort['T_confort'], label='T_confort', color='blue')
+    ax.plot(Zona_confort['T_exterior'], label='T_exterior', color='green')
+    ax.fill_between(
+        Zona_confort.index,
+        Zona_confort['Lim_inf'],
+        Zona_confort['Lim_sup'],
+        color='gray',
+        alpha=0.3,
+        label='Zona de confort'
+    )
+
+    # Personalizar la gráfica
+    ax.set_title('Zona de confort con la norma ASHRAE 55 (2013)')
+    ax.set_xlabel('Mes')
+    ax.set_ylabel('Temperatura [°C]')
+    ax.set_xticks(ticks=range(len(meses)))
+    ax.set_xticklabels(meses)
+
+    # Personalizar el eje Y para intervalos de 0.5 grados
+    min_y = Zona_confort['Lim_inf'].min() - 1  # Margen inferior
+    max_y = Zona_confort['Lim_sup'].max() + 1  # Margen superior
+    ax.set_yticks(np.arange(np.floor(min_y), np.ceil(max_y) + 0.5, 0.5))
+
+    ax.legend()
+    ax.grid()
+    return codificar(fig, formato)
+
+
+def grafica_heatmap(matriz, desde, hasta, ticks_completos, etiqueta, titulo, eje_x, formato="png"):
+    cargar()
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    # Crear el heatmap sin barra de color
+    sbn.heatmap(matriz, cmap="jet", vmin=desde, vmax=hasta, cbar=False, ax=ax)
+
+    # Mostrar el heatmap con imshow
+    p = ax.imshow(matriz, aspect="auto", cmap="jet", vmin=desde, vmax=hasta)
+
+    # Crear la colorbar
+    cbar = fig.colorbar(p, label=etiqueta)
+
+    # Establecer los ticks completos en la colorbar
+    cbar.set_ticks(ticks_completos)
+
+    # Etiquetar los ticks
+    cbar.set_ticklabels([f"{tick}" for tick in ticks_completos])
+
+    # Mostrar los límites inferiores y superiores en ambos extremos de la colorbar
+    cbar.ax.tick_params(which="both", direction="out", top=True, bottom=True)
+
+    # Personalizar los valores del eje Y para que estén horizontales
+    ax.tick_params(axis="y", labelrotation=0)  # Configuración para etiquetas horizontales
+
+    # Personalizar el título y los ejes
+    ax.set_title(titulo, fontsize=12, fontweight="bold")
+    ax.set_ylabel("Tiempo [h]")
+    ax.set_xlabel(eje_x)
+    return codificar(fig, formato)
+
+
+def grafica_rosa_vientos(frecuencias, sectores, clases, titulo, formato="png"):
+    # Barras apiladas por clase de velocidad en cada sector; el radio es el % de registros
+    cargar()
+    fig, ax = plt.subplots(figsize=FIGSIZE, subplot_kw={"projection": "polar"})
+    ax.set_theta_zero_location("N")
+    ax.set_theta_direction(-1)
+
+    angulos = np.arange(len(sectores)) * 2 * np.pi / len(sectores)
+    ancho = 2 * np.pi / len(sectores) * 0.9
+    colores = plt.get_cmap("jet")(np.linspace(0, 1, len(clases)))
+    base = np.zeros(len(sectores))
+    for j, clase in enumerate(clases):
+        ax.bar(angulos, frecuencias[:, j], width=ancho, bottom=base, color=colores[j],
+               edgecolor="white", linewidth=0.5, label=clase)
+        base = base + frecuencias[:, j]
+
+    ax.set_xticks(angulos)
+    ax.set_xticklabels(sectores)
+    ax.yaxis.set_major_formatter(ticker.FuncFormatter(lambda v, _: f"{v:g}%"))
+    ax.set_title(titulo, fontsize=12, fontweight="bold")
+    ax.legend(title="Velocidad [m/s]", loc="center left", bbox_to_anchor=(1.1, 0.5))
+    return codificar(fig, formato)
@@ -0,0 +1,126 @@
+import fcntl
+import glob
+import logging
+import os
+import threading
+
+import pandas as pd
+
+import estaciones
+
+# Ingesta incremental: los datos nuevos de una estación se dejan como CSV (con encabezado) en
+# data/entrada/<estación>/. Un hilo los agrega al final del CSV de la estación y recarga las
+# estaciones en memoria; datos.py sólo lee las filas agregadas y estaciones.py sólo acumula esas
+# filas en las climatologías, así que no hace falta reiniciar la app. También se detectan filas
+# agregadas directamente al CSV por otro proceso. Los archivos que no se pueden leer pasan a
+# rechazados/; las filas anteriores al último registro de la estación se descartan, porque el cache
+# sólo crece por el final y una reconstrucción completa sí las tomaría.
+INTERVALO = float(os.environ.get("ECOVENT_INGESTA_S", 30))
+DIR_ENTRADA = os.path.join(estaciones.DIR_DATOS, "entrada")
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+_hilo = None
+_candado = threading.Lock()
+log = logging.getLogger(__name__)
+
+
+def _fin_de_linea(f):
+    f.seek(0)
+    linea = f.readline()
+    return "\r\n" if linea.endswith(b"\r\n") else "\n"
+
+
+def _ultima_fecha(f, bloque=1 << 12):
+    # Fecha del último registro del CSV; None si sólo tiene encabezado
+    f.seek(max(0, f.seek(0, os.SEEK_END) - bloque))
+    lineas = [linea for linea in f.read().splitlines() if linea.strip()]
+    if not lineas:
+        return None
+    # Con sólo el encabezado la primera columna no es una fecha
+    try:
+        return pd.Timestamp(lineas[-1].split(b",", 1)[0].decode())
+    except ValueError:
+        return None
+
+
+def anexar(ruta, nuevos):
+    # Agrega las filas de `nuevos` al CSV de la estación en el orden de columnas de su encabezado.
+    # Devuelve cuántas filas se descartaron por no ser posteriores al último registro
+    with open(ruta, "rb+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            encabezado = pd.read_csv(f, nrows=0)
+            fin = _fin_de_linea(f)
+            ultima = _ultima_fecha(f)
+            total = len(nuevos)
+            if ultima is not None:
+                nuevos = nuevos[nuevos.index > ultima]
+            if len(nuevos):
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(fin.encode())
+                nuevos = nuevos.reindex(columns=encabezado.columns[1:])
+                texto = nuevos.to_csv(header=False, date_format=FORMATO_FECHA, lineterminator=fin)
+                f.write(texto.encode())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    return total - len(nuevos)
+
+
+def _mover(tomado, carpeta, archivo):
+    os.makedirs(carpeta, exist_ok=True)
+    os.replace(tomado, os.path.join(carpeta, os.path.basename(archivo)))
+
+
+def procesar(ruta):
+    carpeta = os.path.join(DIR_ENTRADA, os.path.splitext(os.path.basename(ruta))[0])
+    hechos = []
+    for archivo in sorted(glob.glob(os.path.join(carpeta, "*.csv"))):
+        # Renombrar es atómico: si otro proceso ya tomó el archivo se salta
+        tomado = f"{archivo}.procesando.{os.getpid()}"
+        try:
+            os.rename(archivo, tomado)
+        except OSError:
+            continue
+        try:
+            nuevos = pd.read_csv(tomado, index_col=0, parse_dates=True).sort_index()
+            if not isinstance(nuevos.index, pd.DatetimeIndex):
+                raise ValueError("la primera columna no son fechas")
+            descartadas = anexar(ruta, nuevos)
+        except Exception:
+            log.exception("ingesta: %s rechazado", archivo)
+            _mover(tomado, os.path.join(carpeta, "rechazados"), archivo)
+            continue
+        if descartadas:
+            log.warning("ingesta: %s: %d de %d filas no son posteriores al último registro de %s y se descartaron",
+                        archivo, descartadas, len(nuevos), ruta)
+        _mover(tomado, os.path.join(carpeta, "procesados"), archivo)
+        hechos.append(archivo)
+    return hechos
+
+
+def revisar():
+    for ruta in estaciones.disponibles():
+        try:
+            procesar(ruta)
+        except OSError:
+            log.exception("ingesta: no se pudo revisar la entrada de %s", ruta)
+    return estaciones.revisar()
+
+
+def _vigilar(evento):
+    while not evento.wait(INTERVALO):
+        try:
+            revisar()
+        except Exception:
+            log.exception("ingesta: falló la revisión de las estaciones")
+
+
+def iniciar():
+    global _hilo
+    with _candado:
+        if _hilo is None and INTERVALO > 0:
+            _hilo = threading.Thread(target=_vigilar, args=(threading.Event(),), daemon=True, name="ingesta")
+            _hilo.start()
@@ -0,0 +1,190 @@
+import functools
+import inspect
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Métricas del proceso de la app: histogramas de latencia y contadores con etiquetas, que se
+# leen desde el panel de diagnóstico (app.py) y desde /metrics en formato de texto de Prometheus
+# (servidor.py). Los histogramas tienen cubetas fijas, así que registrar una medida es sumar
+# uno en su cubeta; los percentiles del panel se estiman a partir de ellas.
+LIMITES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+AYUDA = {
+    "ecovent_carga_segundos": "Carga y agregación de datos de una estación",
+    "ecovent_reactivo_segundos": "Ejecución de salidas y efectos de Shiny en el proceso de la app",
+    "ecovent_dibujo_segundos": "Dibujo de una gráfica en un trabajador, por fase",
+    "ecovent_dibujo_espera_segundos": "Desde que se pide una gráfica hasta que está lista (cola incluida)",
+    "ecovent_salidas_total": "Ejecuciones de salidas y efectos de Shiny",
+    "ecovent_dibujos_total": "Gráficas dibujadas",
+    "ecovent_exportacion_segundos": "Armado de un archivo de /exportar",
+    "ecovent_exportaciones_total": "Respuestas de /exportar, por estado (200 o 304)",
+    "ecovent_errores_total": "Excepciones en salidas y efectos (sin contar req)",
+}
+
+_histogramas = {}
+_contadores = {}
+_candado = threading.Lock()
+
+
+def _clave(metrica, etiquetas):
+    return metrica, tuple(sorted(etiquetas.items()))
+
+
+def observar(metrica, segundos, **etiquetas):
+    clave = _clave(metrica, etiquetas)
+    with _candado:
+        h = _histogramas.get(clave)
+        if h is None:
+            h = _histogramas[clave] = {"cubetas": [0] * (len(LIMITES) + 1), "suma": 0.0, "n": 0}
+        i = 0
+        while i < len(LIMITES) and segundos > LIMITES[i]:
+            i += 1
+        h["cubetas"][i] += 1
+        h["suma"] += segundos
+        h["n"] += 1
+
+
+def contar(metrica, n=1, **etiquetas):
+    clave = _clave(metrica, etiquetas)
+    with _candado:
+        _contadores[clave] = _contadores.get(clave, 0) + n
+
+
+@contextmanager
+def medir(metrica, **etiquetas):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(metrica, time.perf_counter() - t, **etiquetas)
+
+
+def medido(fn):
+    # Para salidas (debajo de @render.*) y efectos (debajo de @reactive.effect): tiempo de cada
+    # ejecución y excepciones, con el nombre de la función como etiqueta
+    nombre = fn.__name__
+
+    def registrar(t, error):
+        observar("ecovent_reactivo_segundos", time.perf_counter() - t, nombre=nombre)
+        contar("ecovent_salidas_total", nombre=nombre)
+        if error is not None and type(error).__name__ != "SilentException":
+            contar("ecovent_errores_total", nombre=nombre, tipo=type(error).__name__)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def envuelta(*args, **kwargs):
+            t, error = time.perf_counter(), None
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                registrar(t, error)
+    else:
+        @functools.wraps(fn)
+        def envuelta(*args, **kwargs):
+            t, error = time.perf_counter(), None
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                registrar(t, error)
+    return envuelta
+
+
+def memoria():
+    # Bytes residentes ahora y pico del proceso
+    actual = None
+    try:
+        with open("/proc/self/statm") as f:
+            actual = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return {"residente_bytes": actual, "pico_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def _percentil(cubetas, q):
+    # Límite superior de la cubeta donde cae el percentil q
+    total = sum(cubetas)
+    if total == 0:
+        return float("nan")
+    acumulado = 0
+    for limite, n in zip(LIMITES + (float("inf"),), cubetas):
+        acumulado += n
+        if acumulado >= q * total:
+            return limite
+    return float("inf")
+
+
+def histogramas():
+    with _candado:
+        copia = {clave: {**h, "cubetas": list(h["cubetas"])} for clave, h in _histogramas.items()}
+    filas = []
+    for (nombre, etiquetas), h in sorted(copia.items()):
+        filas.append({
+            "métrica": nombre,
+            "etiquetas": ", ".join(f"{k}={v}" for k, v in etiquetas),
+            "n": h["n"],
+            "media_ms": round(1000 * h["suma"] / h["n"], 2),
+            "p50_ms": 1000 * _percentil(h["cubetas"], 0.5),
+            "p90_ms": 1000 * _percentil(h["cubetas"], 0.9),
+            "p99_ms": 1000 * _percentil(h["cubetas"], 0.99),
+        })
+    return filas
+
+
+def contadores():
+    with _candado:
+        copia = dict(_contadores)
+    return [{"métrica": nombre, "etiquetas": ", ".join(f"{k}={v}" for k, v in etiquetas), "valor": valor}
+            for (nombre, etiquetas), valor in sorted(copia.items())]
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas) + "}"
+
+
+def prometheus(extra=()):
+    # Formato de texto de Prometheus; `extra` son (nombre, tipo, ayuda, valor) calculados al vuelo
+    with _candado:
+        hs = {clave: {**h, "cubetas": list(h["cubetas"])} for clave, h in _histogramas.items()}
+        cs = dict(_contadores)
+    lineas = []
+    vistos = set()
+
+    def encabezado(nombre, tipo, ayuda):
+        if nombre not in vistos:
+            vistos.add(nombre)
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+    for (nombre, etiquetas), h in sorted(hs.items()):
+        encabezado(nombre, "histogram", AYUDA.get(nombre, nombre))
+        acumulado = 0
+        for limite, n in zip(LIMITES + (float("inf"),), h["cubetas"]):
+            acumulado += n
+            le = "+Inf" if limite == float("inf") else repr(float(limite))
+            lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + (('le', le),))} {acumulado}")
+        lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {h['suma']}")
+        lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {h['n']}")
+    for (nombre, etiquetas), valor in sorted(cs.items()):
+        encabezado(nombre, "counter", AYUDA.get(nombre, nombre))
+        lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+    for nombre, tipo, ayuda, valor in extra:
+        if valor is None:
+            continue
+        encabezado(nombre, tipo, ayuda)
+        lineas.append(f"{nombre} {valor}")
+    return "\n".join(lineas) + "\n"
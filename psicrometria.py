@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# Propiedades psicrométricas a partir de la temperatura de bulbo seco [°C] y la humedad
+# relativa [%]. Todas son expresiones de NumPy sobre la serie completa; el bulbo húmedo usa la
+# aproximación de Stull (2011), que no requiere iterar.
+VARIABLES = ("T_rocio", "W", "h", "T_bulbo_humedo")
+ETIQUETAS = {
+    "T_rocio": "Temperatura de rocío [°C]",
+    "W": "Razón de humedad [g/kg]",
+    "h": "Entalpía [kJ/kg]",
+    "T_bulbo_humedo": "Temperatura de bulbo húmedo [°C]",
+}
+
+# Constantes de Magnus (Alduchov y Eskridge, 1996)
+A, B, C = 610.94, 17.625, 243.04
+# Cociente de masas molares agua / aire seco
+EPSILON = 0.621945
+
+
+def presion_atmosferica(altitud):
+    # Atmósfera estándar [Pa]
+    return 101325 * (1 - 2.25577e-5 * altitud) ** 5.2559
+
+
+def presion_saturacion(T):
+    # [Pa]
+    return A * np.exp(B * T / (C + T))
+
+
+def punto_rocio(T, HR):
+    gamma = np.log(HR / 100) + B * T / (C + T)
+    return C * gamma / (B - gamma)
+
+
+def razon_humedad(T, HR, presion):
+    # [kg de vapor / kg de aire seco]
+    pw = HR / 100 * presion_saturacion(T)
+    return EPSILON * pw / (presion - pw)
+
+
+def entalpia(T, W):
+    # [kJ / kg de aire seco]
+    return 1.006 * T + W * (2501 + 1.86 * T)
+
+
+def bulbo_humedo(T, HR):
+    return (T * np.arctan(0.151977 * np.sqrt(HR + 8.313659))
+            + np.arctan(T + HR) - np.arctan(HR - 1.676331)
+            + 0.00391838 * HR ** 1.5 * np.arctan(0.023101 * HR)
+            - 4.686035)
+
+
+def propiedades(df, altitud=0):
+    T = df["Temp_Avg"].to_numpy(dtype="float64")
+    # Una HR de 0 no tiene punto de rocío; se trata como dato faltante
+    HR = df["RH_Avg"].to_numpy(dtype="float64")
+    HR = np.where(HR > 0, HR, np.nan)
+    W = razon_humedad(T, HR, presion_atmosferica(altitud))
+    return pd.DataFrame({
+        "T_rocio": punto_rocio(T, HR),
+        "W": 1000 * W,
+        "h": entalpia(T, W),
+        "T_bulbo_humedo": bulbo_humedo(T, HR),
+    }, index=df.index)
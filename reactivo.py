@@ -0,0 +1,67 @@
+import math
+import os
+import time
+
+from shiny import reactive
+
+# Antirrebote (debounce) y limitador (throttle) para entradas de Shiny. Mientras se arrastra
+# un slider llegan valores intermedios; con estos envoltorios los cálculos derivados sólo se
+# invalidan cuando el valor se asienta (rebote) o, a lo más, una vez por intervalo (limitar).
+RETARDO = float(os.environ.get("ECOVENT_REBOTE_MS", 250)) / 1000
+
+
+def rebote(fuente, segundos=RETARDO):
+    valor = reactive.value()
+    plazo = reactive.value(None)
+
+    @reactive.effect
+    def _vigilar():
+        v = fuente()
+        with reactive.isolate():
+            if not valor.is_set():
+                # El primer valor pasa sin espera para no retrasar la carga de la página
+                valor.set(v)
+            else:
+                plazo.set(time.monotonic() + segundos)
+
+    @reactive.effect
+    def _emitir():
+        limite = plazo()
+        if limite is None:
+            return
+        restante = limite - time.monotonic()
+        if restante > 0:
+            reactive.invalidate_later(restante)
+            return
+        with reactive.isolate():
+            plazo.set(None)
+            valor.set(fuente())
+
+    @reactive.calc
+    def asentado():
+        return valor()
+
+    return asentado
+
+
+def limitar(fuente, segundos=RETARDO):
+    valor = reactive.value()
+    ultimo = [-math.inf]
+
+    @reactive.effect
+    def _emitir():
+        v = fuente()
+        restante = ultimo[0] + segundos - time.monotonic()
+        if restante > 0:
+            # Al vencer el plazo el efecto vuelve a correr y toma el valor más reciente
+            reactive.invalidate_later(restante)
+            return
+        ultimo[0] = time.monotonic()
+        with reactive.isolate():
+            valor.set(v)
+
+    @reactive.calc
+    def limitado():
+        return valor()
+
+    return limitado
@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import estaciones
+import vistas
+from graficas import meses
+
+# Reportes estáticos sin Shiny: zona de confort y mapas de calor anuales de cada estación, más
+# los mapas de calor diarios de cada mes, en PNG y/o PDF, con una página HTML por estación. Usa
+# las mismas agregaciones (estaciones.py) y gráficas (vistas.py, graficas.py) que la app.
+# Primero se preparan las estaciones en paralelo y después se reparten las gráficas
+# (estación x mes x variable x formato) entre los mismos procesos. Cada archivo guarda en
+# manifiesto.json la huella de lo que lo produjo (clave de la vista, con la versión de los
+# datos); si no cambió y el archivo existe, no se vuelve a dibujar.
+#
+#   python reportes.py                                   # todas las estaciones, todos los meses
+#   python reportes.py --estaciones data/R-U-O-A_completo.csv --meses 1 7 --formatos pdf
+FORMATOS = ("png", "pdf", "html")
+# Subir cuando cambie el aspecto de las gráficas para que se redibujen todas
+VERSION_REPORTE = 1
+MANIFIESTO = "manifiesto.json"
+
+
+def _iniciar():
+    import graficas
+    graficas.cargar()
+
+
+def _preparar(ruta, meses_pedidos):
+    # Vistas de una estación: (clave, función, argumentos), anuales y de cada mes con datos
+    d = estaciones.preparar(ruta)
+    lista = vistas.anuales(d)
+    for mes in meses_pedidos:
+        lista += vistas.mensuales(d, f"{mes:02d}")
+    return d["nombre"], d["anios"], lista
+
+
+def _dibujar(fn, args, formato, destino):
+    imagen = fn(*args, formato=formato)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(imagen)
+    os.replace(temporal, destino)
+    return destino
+
+
+def _archivo(clave):
+    # zona_confort, Heatmap_anual, ..., Heatmap_mensual_03
+    tipo = clave[3]
+    return f"{tipo}_{clave[5]}" if tipo.startswith("Heatmap_mensual") else tipo
+
+
+def _huella(clave, formato):
+    return hashlib.sha1(repr((VERSION_REPORTE, formato, clave)).encode()).hexdigest()
+
+
+def _leer_manifiesto(salida):
+    try:
+        with open(os.path.join(salida, MANIFIESTO)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_manifiesto(salida, manifiesto):
+    ruta = os.path.join(salida, MANIFIESTO)
+    with open(ruta + ".tmp", "w") as f:
+        json.dump(manifiesto, f, indent=1, sort_keys=True)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _pagina(titulo, cuerpo):
+    return (f'<!DOCTYPE html>\n<html lang="es">\n<head><meta charset="utf-8"><title>{html.escape(titulo)}</title>'
+            f'<style>body{{font-family:sans-serif;margin:2em}}img{{max-width:100%}}</style></head>\n'
+            f'<body>\n<h1>{html.escape(titulo)}</h1>\n{cuerpo}\n</body>\n</html>\n')
+
+
+def _html_estacion(carpeta, nombre, anios, archivos):
+    # archivos: nombres de los PNG de la estación en el orden de las vistas
+    partes = [f"<p>{anios[0]}-{anios[1]}</p>"]
+    mes_anterior = None
+    for archivo in archivos:
+        base = os.path.splitext(archivo)[0]
+        if base.startswith("Heatmap_mensual"):
+            mes = int(base.rsplit("_", 1)[1])
+            if mes != mes_anterior:
+                partes.append(f"<h2>{html.escape(meses[mes - 1])}</h2>")
+                mes_anterior = mes
+        partes.append(f'<img src="{html.escape(archivo)}" alt="{html.escape(base)}">')
+    with open(os.path.join(carpeta, "index.html"), "w") as f:
+        f.write(_pagina(nombre, "\n".join(partes)))
+
+
+def _html_indice(salida, paginas):
+    lista = "\n".join(f'<li><a href="{html.escape(carpeta)}/index.html">{html.escape(nombre)}</a></li>'
+                      for carpeta, nombre in paginas)
+    with open(os.path.join(salida, "index.html"), "w") as f:
+        f.write(_pagina("Reportes de estaciones", f"<ul>\n{lista}\n</ul>"))
+
+
+def generar(rutas, meses_pedidos, salida, formatos, trabajadores=None, forzar=False):
+    # Devuelve (dibujados, saltados)
+    formatos = set(formatos)
+    if "html" in formatos:
+        formatos.add("png")
+    imagenes = [f for f in ("png", "pdf") if f in formatos]
+    os.makedirs(salida, exist_ok=True)
+    manifiesto = {} if forzar else _leer_manifiesto(salida)
+    dibujados = saltados = 0
+    paginas = []
+
+    with ProcessPoolExecutor(trabajadores, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_iniciar) as pool:
+        preparadas = {pool.submit(_preparar, ruta, meses_pedidos): ruta for ruta in rutas}
+        pendientes = {}
+        for futuro in as_completed(preparadas):
+            ruta = preparadas[futuro]
+            try:
+                nombre, anios, lista = futuro.result()
+            except Exception as e:
+                print(f"reportes: {os.path.basename(ruta)}: {e!r}")
+                continue
+            estacion = os.path.splitext(os.path.basename(ruta))[0]
+            carpeta = os.path.join(salida, estacion)
+            os.makedirs(carpeta, exist_ok=True)
+            for clave, fn, args in lista:
+                for formato in imagenes:
+                    relativo = os.path.join(estacion, f"{_archivo(clave)}.{formato}")
+                    huella = _huella(clave, formato)
+                    if manifiesto.get(relativo) == huella and os.path.exists(os.path.join(salida, relativo)):
+                        saltados += 1
+                        continue
+                    destino = os.path.join(salida, relativo)
+                    pendientes[pool.submit(_dibujar, fn, args, formato, destino)] = (relativo, huella)
+            if "html" in formatos:
+                _html_estacion(carpeta, nombre, anios, [f"{_archivo(clave)}.png" for clave, _, _ in lista])
+                paginas.append((estacion, nombre))
+
+        for futuro in as_completed(pendientes):
+            relativo, huella = pendientes[futuro]
+            try:
+                futuro.result()
+            except Exception as e:
+                print(f"reportes: {relativo}: {e!r}")
+                manifiesto.pop(relativo, None)
+                continue
+            manifiesto[relativo] = huella
+            dibujados += 1
+
+    if "html" in formatos:
+        _html_indice(salida, sorted(paginas))
+    _guardar_manifiesto(salida, manifiesto)
+    return dibujados, saltados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reportes estáticos de las estaciones sin la app")
+    parser.add_argument("--estaciones", nargs="+", help="CSV de estaciones (por defecto todas las de data/)")
+    parser.add_argument("--meses", type=int, nargs="+", default=list(range(1, 13)), choices=range(1, 13),
+                        metavar="MES")
+    parser.add_argument("--salida", default="reportes")
+    parser.add_argument("--formatos", nargs="+", default=list(FORMATOS), choices=FORMATOS)
+    parser.add_argument("--trabajadores", type=int, default=os.cpu_count())
+    parser.add_argument("--forzar", action="store_true", help="redibujar aunque los datos no hayan cambiado")
+    args = parser.parse_args()
+
+    rutas = args.estaciones or list(estaciones.disponibles())
+    t = time.perf_counter()
+    dibujados, saltados = generar(rutas, sorted(set(args.meses)), args.salida, args.formatos,
+                                  args.trabajadores, args.forzar)
+    print(f"reportes: {len(rutas)} estaciones, {dibujados} archivos dibujados, {saltados} sin cambios, "
+          f"{time.perf_counter() - t:.1f} s en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import base64
+
+from shiny import ui
+from shiny.render.renderer import Renderer
+
+import metricas
+
+# Salidas de Shiny propias de la app.
+
+
+class imagen_png(Renderer[bytes]):
+    # Como render.image, pero la función devuelve directamente los bytes del PNG
+    # (por ejemplo, sacados de cache_render) en lugar de la ruta de un archivo
+    def auto_output_ui(self):
+        return ui.output_image(self.output_id, height="auto")
+
+    def __init__(self, _fn=None, *, alt=None):
+        super().__init__(_fn)
+        self.alt = alt
+
+    async def render(self):
+        # Las imágenes se dibujan en los trabajadores (ver trabajadores.py); aquí sólo se mide
+        # cuánto tarda en salir cada una
+        with metricas.medir("ecovent_reactivo_segundos", nombre=self.output_id):
+            metricas.contar("ecovent_salidas_total", nombre=self.output_id)
+            return await super().render()
+
+    async def transform(self, value):
+        datos = base64.b64encode(value).decode("utf-8")
+        img = {"src": f"data:image/png;base64,{datos}", "style": "width:100%;height:auto;"}
+        if self.alt is not None:
+            img["alt"] = self.alt
+        return img
+
+
+def heatmap_cliente(id, matriz, horas, periodo, rango, delta, ajuste, limites, etiqueta, titulo, eje_x, mes=None):
+    # Lienzo para el modo interactivo; www/heatmap_cliente.js lee de los atributos qué matriz
+    # dibujar y qué entradas de la página controlan el recorte y los límites de color
+    return ui.tags.canvas(
+        id=id,
+        class_="ecovent-heatmap",
+        style="width:100%;",
+        data_matriz=matriz,
+        data_horas=horas,
+        data_periodo=periodo,
+        data_mes=mes,
+        data_rango=rango,
+        data_delta=delta,
+        data_ajuste=ajuste,
+        data_limites=limites,
+        data_etiqueta=etiqueta,
+        data_titulo=titulo,
+        data_eje_x=eje_x,
+    )
+
+
+def _codificar(tabla, columnas=None):
+    valores = tabla.to_numpy(dtype="<f4")
+    return {
+        "valores": base64.b64encode(valores.tobytes()).decode("ascii"),
+        "filas": list(tabla.index),
+        "columnas": list(columnas if columnas is not None else tabla.columns),
+    }
+
+
+def _lista(serie):
+    # JSON no admite NaN: los meses sin datos en el rango de años elegido van como null
+    return [None if v != v else v for v in serie.round(2).tolist()]
+
+
+def matrices_cliente(d, meses, clave="media", matrices=None):
+    # Paquete que se envía al navegador una vez por estación y rango de años; se guarda junto
+    # a la estación (o al rango) para no volver a codificarlo en cada sesión. `matrices` reemplaza
+    # las medias To, To_diario, HR y HR_diario (por ejemplo, por percentiles) y `clave` lo distingue
+    cliente = d.setdefault("cliente", {})
+    if clave not in cliente:
+        matrices = matrices or {nombre: d[nombre] for nombre in ("To", "To_diario", "HR", "HR_diario")}
+        # Límites diarios alineados con las columnas de To_diario
+        dias = matrices["To_diario"].columns
+        cliente[clave] = {
+            "estacion": d["ruta"],
+            "matrices": {
+                "To": _codificar(matrices["To"], meses),
+                "To_diario": _codificar(matrices["To_diario"]),
+                "HR": _codificar(matrices["HR"], meses),
+                "HR_diario": _codificar(matrices["HR_diario"]),
+            },
+            "lim_inf": _lista(d["Zona_confort"]["Lim_inf"]),
+            "lim_sup": _lista(d["Zona_confort"]["Lim_sup"]),
+            "lim_inf_dia": _lista(d["Zona_confort_diaria"]["Lim_inf"].loc[dias]),
+            "lim_sup_dia": _lista(d["Zona_confort_diaria"]["Lim_sup"].loc[dias]),
+        }
+    return cliente[clave]
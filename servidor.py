@@ -0,0 +1,78 @@
+import contextlib
+from pathlib import Path
+
+from shiny.express import wrap_express_app
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Mount, Route
+
+import arranque
+import diagnostico
+import estaciones
+import exportar as exportacion
+import metricas
+
+# Punto de entrada para despliegues (uvicorn servidor:app): la app de Shiny más las rutas que
+# consulta el orquestador. /listo responde 503 mientras se preparan las estaciones, los
+# trabajadores de las gráficas y las vistas por defecto, y 200 después, con los tiempos del arranque.
+# /metrics entrega las métricas del proceso en formato de texto de Prometheus.
+# /exportar/<estación>/<tabla>.<formato>?anios=2016-2020&horas=0-23&meses=1-12 entrega las
+# tablas de exportar.py, con ETag para que las consultas repetidas respondan 304.
+
+
+def listo(request):
+    estado = 200 if arranque.listo() else 503
+    return JSONResponse({"listo": arranque.listo(), "tiempos": arranque.tiempos}, status_code=estado)
+
+
+def metrics(request):
+    return PlainTextResponse(diagnostico.prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def exportar(request):
+    nombre, formato = request.path_params["tabla"], request.path_params["formato"]
+    ruta = exportacion.ruta(request.path_params["estacion"])
+    if ruta is None or nombre not in exportacion.TABLAS or formato not in exportacion.FORMATOS:
+        return PlainTextResponse("No encontrado", status_code=404)
+    if not exportacion.disponible(formato):
+        return PlainTextResponse(f"El formato {formato} no está disponible en este servidor (falta pyarrow)",
+                                 status_code=501)
+    # Preparar una estación que no está en memoria bloquea: se hace fuera del ciclo de eventos
+    d = estaciones.cargada(ruta) or await run_in_threadpool(estaciones.estacion, ruta)
+    try:
+        anios = exportacion.rango(request.query_params.get("anios"), d["anios"], *d["anios"])
+        horas = exportacion.rango(request.query_params.get("horas"), exportacion.HORAS, *exportacion.HORAS)
+        meses = exportacion.rango(request.query_params.get("meses"), exportacion.MESES, *exportacion.MESES)
+    except ValueError as e:
+        return PlainTextResponse(str(e), status_code=400)
+
+    etag = exportacion.etag(d, nombre, anios, horas, meses, formato)
+    encabezados = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (v.strip() for v in request.headers.get("if-none-match", "").split(",")):
+        metricas.contar("ecovent_exportaciones_total", tabla=nombre, formato=formato, estado=304)
+        return Response(status_code=304, headers=encabezados)
+    try:
+        with metricas.medir("ecovent_exportacion_segundos", tabla=nombre, formato=formato):
+            contenido, _ = await run_in_threadpool(exportacion.exportar, d, nombre, anios, horas, meses, formato)
+    except ValueError as e:
+        # Formato sin su biblioteca (ya se revisó arriba, pero puede faltar en otro proceso)
+        return PlainTextResponse(str(e), status_code=501)
+    metricas.contar("ecovent_exportaciones_total", tabla=nombre, formato=formato, estado=200)
+    archivo = exportacion.nombre_archivo(d, nombre, anios, formato)
+    encabezados["Content-Disposition"] = f'attachment; filename="{archivo}"'
+    return Response(contenido, media_type=exportacion.FORMATOS[formato][0], headers=encabezados)
+
+
+@contextlib.asynccontextmanager
+async def ciclo(app):
+    arranque.calentar()
+    yield
+
+
+app = Starlette(lifespan=ciclo, routes=[
+    Route("/listo", listo),
+    Route("/metrics", metrics),
+    Route("/exportar/{estacion}/{tabla}.{formato}", exportar),
+    Mount("/", app=wrap_express_app(Path(__file__).parent / "app.py")),
+])
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+import calidad
+from calidad import FALTANTE, FUERA_DE_RANGO, PICO, RELLENO, DESCARTADO, ACUMULADORES, columna_marca
+
+PASO = pd.Timedelta("1h")
+
+
+def _serie(filas=2 * 8760, semilla=0):
+    # Serie horaria con filas que faltan (sueltas y un hueco largo), valores fuera de rango y
+    # picos; devuelve la malla completa (con NaN donde falta la fila) y lo que llega del CSV
+    rng = np.random.default_rng(semilla)
+    indice = pd.date_range("2019-01-01", periods=filas, freq="h", name="TIMESTAMP")
+    hora = indice.hour.to_numpy()
+    malla = pd.DataFrame({
+        "Temp_Avg": 20 + 5 * np.sin(2 * np.pi * hora / 24) + rng.normal(0, 0.5, filas),
+        "RH_Avg": 50 + 20 * np.cos(2 * np.pi * hora / 24) + rng.normal(0, 2, filas),
+        "WSpeed_Avg": rng.gamma(2, 1.5, filas),
+        "WDir_Avg": rng.uniform(0, 360, filas),
+    }, index=indice)
+    interior = np.arange(1, filas - 1)
+    for columna, valores in (("Temp_Avg", (80, -60)), ("RH_Avg", (120, -5)), ("WSpeed_Avg", (-1,)),
+                             ("WDir_Avg", (400,))):
+        malla.iloc[rng.choice(interior, 40), malla.columns.get_loc(columna)] = rng.choice(valores, 40)
+    for columna, salto in (("Temp_Avg", 15), ("RH_Avg", 45)):
+        malla.iloc[rng.choice(interior, 40), malla.columns.get_loc(columna)] += salto
+    malla.iloc[rng.choice(interior, 80), 0] = np.nan
+    faltan = np.unique(np.concatenate((rng.choice(interior, 150, replace=False), np.arange(1000, 1003),
+                                       np.arange(5000, 5010))))
+    leida = malla.drop(malla.index[faltan])
+    malla.iloc[faltan] = np.nan
+    return malla, leida
+
+
+def _depurar_lazo(x, columna):
+    # Referencia fila por fila de calidad.depurar para una columna ya en la malla
+    x = x.copy()
+    n = len(x)
+    marca = np.zeros(n, dtype=np.int8)
+    for i in range(n):
+        if np.isnan(x[i]):
+            marca[i] |= FALTANTE
+        elif columna in calidad.LIMITES and not calidad.LIMITES[columna][0] <= x[i] <= calidad.LIMITES[columna][1]:
+            marca[i] |= FUERA_DE_RANGO
+    x[marca != 0] = np.nan
+    if columna in calidad.PICOS:
+        medio = max(3, int(calidad.VENTANA / PASO) | 1) // 2
+        picos = []
+        for i in range(n):
+            vecinos = [v for v in x[max(0, i - medio):i + medio + 1] if not np.isnan(v)]
+            if len(vecinos) > medio and abs(x[i] - np.median(vecinos)) > calidad.PICOS[columna]:
+                picos.append(i)
+        marca[picos] |= PICO
+        x[picos] = np.nan
+    maximo = int(calidad.MAX_HUECO / PASO)
+    if columna in calidad.INTERPOLABLES and maximo > 0:
+        i = 0
+        while i < n:
+            if not np.isnan(x[i]):
+                i += 1
+                continue
+            j = i
+            while j < n and np.isnan(x[j]):
+                j += 1
+            if i > 0 and j < n and j - i <= maximo:
+                for p in range(i, j):
+                    x[p] = x[i - 1] + (x[j] - x[i - 1]) * (p - i + 1) / (j - i + 1)
+                    marca[p] |= RELLENO
+            i = j
+    return x, marca
+
+
+def test_frecuencia_en_segundos():
+    # read_csv puede dar el índice en segundos: el paso no depende de la unidad
+    indice = pd.DatetimeIndex(np.arange("2020-01-01T00:00", "2020-01-02T00:00", 600, dtype="datetime64[s]"))
+    assert calidad.frecuencia(indice) == pd.Timedelta("10min")
+
+
+def test_depurar_igual_a_lazo():
+    malla, leida = _serie()
+    limpio = calidad.depurar(leida)
+    assert (limpio.index == malla.index).all()
+    for c in malla.columns:
+        x, marca = _depurar_lazo(malla[c].to_numpy(), c)
+        np.testing.assert_allclose(limpio[c].to_numpy(), x, equal_nan=True)
+        np.testing.assert_array_equal(limpio[columna_marca(c)].to_numpy(), marca)
+
+
+def test_depurar_con_previo_igual_a_completo():
+    # Un bloque nuevo depurado con las últimas filas ya depuradas da lo mismo que depurar todo,
+    # mientras no haya anomalías en la frontera
+    indice = pd.date_range("2019-01-01", periods=600, freq="h", name="TIMESTAMP")
+    fase = 2 * np.pi * indice.hour.to_numpy() / 24
+    malla = pd.DataFrame({
+        "Temp_Avg": 20 + 5 * np.sin(fase),
+        "RH_Avg": 50 + 20 * np.cos(fase),
+        "WSpeed_Avg": 2 + np.sin(fase),
+        "WDir_Avg": 180 + 90 * np.sin(fase),
+    }, index=indice)
+    malla.iloc[[100, 101, 450], 0] = np.nan
+    malla.iloc[[150, 520], 1] = 130
+    malla.iloc[[200, 500], 0] += 15
+    completo = calidad.depurar(malla)
+    previo = completo[list(malla.columns)].iloc[400 - calidad.CONTEXTO:400]
+    nuevo = calidad.depurar(malla.iloc[400:], PASO, previo)
+    pd.testing.assert_frame_equal(nuevo, completo.iloc[400:], check_freq=False)
+    assert (nuevo["Temp_Avg_calidad"] & PICO).sum() == 1
+
+
+def test_conteos_igual_a_lazo():
+    _, leida = _serie()
+    limpio = calidad.depurar(leida)
+    conteo = calidad.conteos(limpio)
+    anios = list(conteo["anios"])
+    for k, v in enumerate(conteo["variables"]):
+        esperado = {clave: np.zeros((len(anios), 12, 24), dtype=np.int64) for clave in ACUMULADORES}
+        for t, m in zip(limpio.index, limpio[columna_marca(v)].to_numpy()):
+            celda = (anios.index(t.year), t.month - 1, t.hour)
+            esperado["n_validas"][celda] += m & (FALTANTE | DESCARTADO) == 0
+            esperado["n_faltantes"][celda] += m & FALTANTE != 0
+            esperado["n_descartadas"][celda] += m & DESCARTADO != 0
+            esperado["n_rellenadas"][celda] += m & RELLENO != 0
+        for clave in ACUMULADORES:
+            np.testing.assert_array_equal(conteo[clave][k], esperado[clave])
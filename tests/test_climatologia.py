@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from climatologia import climatologia, prefijos, periodo, sumar, tabla_mensual, tabla_diaria, media_exponencial
+
+
+def _serie(semilla=0):
+    # Cuatro años horarios (2004 bisiesto) con valores faltantes y un año sin datos de marzo
+    rng = np.random.default_rng(semilla)
+    indice = pd.date_range("2001-01-01", "2004-12-31 23:00", freq="h", name="TIMESTAMP")
+    df = pd.DataFrame({
+        "Temp_Avg": rng.normal(20, 5, len(indice)),
+        "RH_Avg": rng.uniform(10, 90, len(indice)),
+    }, index=indice)
+    df.iloc[rng.choice(len(df), len(df) // 20, replace=False), 0] = np.nan
+    return df[~((df.index.year == 2002) & (df.index.month == 3))]
+
+
+def _mensual_groupby(df, variable):
+    # Referencia: el groupby por hora y mes que reemplazaron las climatologías
+    tabla = df.groupby([df.index.hour, df.index.month])[variable].mean().unstack()
+    return tabla.reindex(index=range(24), columns=range(1, 13)).to_numpy()
+
+
+def _diaria_groupby(df, variable):
+    tabla = df.groupby([df.index.hour, df.index.strftime("%m-%d")])[variable].mean().unstack()
+    return tabla.dropna(axis=1, how="all")
+
+
+@pytest.mark.parametrize("desde, hasta", [(2001, 2004), (2002, 2002), (2002, 2003), (1990, 2001), (2004, 2030)])
+def test_periodo_igual_a_groupby(desde, hasta):
+    df = _serie()
+    clima = periodo(prefijos(climatologia(df)), desde, hasta)
+    parte = df[(df.index.year >= desde) & (df.index.year <= hasta)]
+    for variable in ("Temp_Avg", "RH_Avg"):
+        np.testing.assert_allclose(tabla_mensual(clima, variable).to_numpy(), _mensual_groupby(parte, variable),
+                                   equal_nan=True)
+        diaria = tabla_diaria(clima, variable)
+        referencia = _diaria_groupby(parte, variable)
+        assert list(diaria.columns) == list(referencia.columns)
+        np.testing.assert_allclose(diaria.to_numpy(), referencia.to_numpy(), equal_nan=True)
+
+
+def test_sumar_por_bloques():
+    # Acumular dos bloques de filas (el segundo con un año nuevo) da lo mismo que todo junto
+    df = _serie()
+    corte = df.index.searchsorted(pd.Timestamp("2003-07-15 06:00"))
+    juntas = sumar(climatologia(df.iloc[:corte]), climatologia(df.iloc[corte:]))
+    completa = climatologia(df)
+    np.testing.assert_array_equal(juntas["anios"], completa["anios"])
+    for clave in ("suma_mes", "n_mes", "suma_dia", "n_dia"):
+        np.testing.assert_allclose(juntas[clave], completa[clave])
+
+
+def _media_exponencial_lazo(x, alfa):
+    y = np.empty(len(x))
+    y[0] = x[0]
+    for n in range(1, len(x)):
+        y[n] = alfa * y[n - 1] + (1 - alfa) * x[n - 1]
+    return y
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 365, 5000])
+@pytest.mark.parametrize("alfa", [0.8, 0.33, 0.99])
+def test_media_exponencial_igual_a_lazo(n, alfa):
+    x = np.random.default_rng(n).normal(20, 5, n)
+    np.testing.assert_allclose(media_exponencial(x, alfa), _media_exponencial_lazo(x, alfa), rtol=1e-10)
+
+
+def test_media_exponencial_vacia():
+    assert len(media_exponencial(np.array([]))) == 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cuantiles import CUANTILES, CUBETAS, histogramas, combinar, tablas
+
+
+def _serie(desde, hasta, semilla=0):
+    rng = np.random.default_rng(semilla)
+    indice = pd.date_range(desde, hasta, freq="h", name="TIMESTAMP")
+    df = pd.DataFrame({
+        "Temp_Avg": rng.normal(20, 6, len(indice)).clip(-9, 49),
+        "RH_Avg": rng.uniform(1, 99, len(indice)),
+    }, index=indice)
+    df.iloc[rng.choice(len(df), len(df) // 20, replace=False), 1] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("variable", ["Temp_Avg", "RH_Avg"])
+@pytest.mark.parametrize("nombre", list(CUANTILES))
+def test_cuantil_cerca_de_quantile(variable, nombre):
+    # Dentro del rango de las cubetas el percentil estimado queda a menos de una cubeta del de
+    # Series.quantile(), también en las celdas diarias (tres muestras por celda)
+    df = _serie("2003-01-01", "2005-12-31 23:00")
+    q = CUANTILES[nombre]
+    ancho = CUBETAS[variable][2]
+    resultado = tablas(histogramas(df), variable, q)
+    mensual = df.groupby([df.index.hour, df.index.month])[variable].quantile(q).unstack()
+    diaria = df.groupby([df.index.hour, df.index.strftime("%m-%d")])[variable].quantile(q).unstack()
+    assert np.abs(resultado["mensual"].to_numpy() - mensual.to_numpy()).max() < ancho
+    assert list(resultado["diaria"].columns) == list(diaria.columns)
+    assert np.nanmax(np.abs(resultado["diaria"].to_numpy() - diaria.to_numpy())) < ancho
+
+
+def test_combinar_por_bloques():
+    df = _serie("2003-01-01", "2004-12-31 23:00")
+    corte = len(df) // 3
+    juntos = combinar(histogramas(df.iloc[:corte]), histogramas(df.iloc[corte:]))
+    for clave, valor in histogramas(df).items():
+        np.testing.assert_array_equal(juntos[clave], valor)
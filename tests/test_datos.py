@@ -0,0 +1,80 @@
+import hashlib
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import calidad
+import datos
+
+COLUMNAS = ["Temp_Avg", "RH_Avg", "WSpeed_Avg", "WDir_Avg"]
+
+
+def _lineas(desde, filas, quitar=(), fuera=()):
+    # Serie horaria suave (sin picos) en el formato de data/; `quitar` son filas que no se
+    # escriben y `fuera` filas con una temperatura fuera de rango
+    lineas = []
+    for i, t in enumerate(pd.date_range(desde, periods=filas, freq="h")):
+        if i in quitar:
+            continue
+        temp = 99.0 if i in fuera else 20 + 5 * np.sin(2 * np.pi * t.hour / 24)
+        lineas.append(f"{t:%Y-%m-%d %H:%M:%S},{temp:.3f},{50 + 10 * np.cos(2 * np.pi * t.hour / 24):.3f},2.5,180.0\n")
+    return lineas
+
+
+def _escribir(ruta, lineas, modo="w"):
+    with open(ruta, modo) as f:
+        if modo == "w":
+            f.write("TIMESTAMP," + ",".join(COLUMNAS) + "\n")
+        f.writelines(lineas)
+
+
+def test_anexar_igual_a_reconstruir(tmp_path):
+    # Las filas agregadas al final del CSV se depuran como un segmento más; el resultado tiene
+    # que ser el mismo que construir el cache desde cero con el CSV completo
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    ruta = str(tmp_path / "a" / "estacion.csv")
+    _escribir(ruta, _lineas("2020-01-01", 500, quitar={300}, fuera={200}))
+    with open(ruta, "rb") as f:
+        h0 = hashlib.sha1(f.read()).hexdigest()
+    primera = datos.cargar_estacion(ruta)
+    assert len(primera) == 500
+    assert primera.attrs["historial"] == [[h0, 500]]
+
+    nuevas = _lineas("2020-01-01", 600)[500:]
+    _escribir(ruta, nuevas, "a")
+    incremental = datos.cargar_estacion(ruta)
+    assert datos._leer_meta(datos.ruta_cache(ruta))["segmentos"] == 2
+
+    copia = str(tmp_path / "b" / "estacion.csv")
+    shutil.copy(ruta, copia)
+    completa = datos.cargar_estacion(copia)
+
+    assert len(incremental) == len(completa) == 600
+    assert (incremental.index == completa.index).all()
+    for c in COLUMNAS:
+        np.testing.assert_allclose(incremental[c].to_numpy(), completa[c].to_numpy(), equal_nan=True)
+        marca = calidad.columna_marca(c)
+        np.testing.assert_array_equal(incremental[marca].to_numpy(), completa[marca].to_numpy())
+    assert completa["Temp_Avg_calidad"].iloc[200] == calidad.FUERA_DE_RANGO | calidad.RELLENO
+    assert completa["Temp_Avg_calidad"].iloc[300] == calidad.FALTANTE | calidad.RELLENO
+
+    # La huella del segmento nuevo encadena la anterior con las filas agregadas
+    h1 = hashlib.sha1((h0 + hashlib.sha1("".join(nuevas).encode()).hexdigest()).encode()).hexdigest()
+    assert incremental.attrs["huella"] == h1
+    assert incremental.attrs["historial"] == [[h0, 500], [h1, 600]]
+    # Sin cambios en el CSV se lee el mismo cache
+    assert datos.cargar_estacion(ruta).attrs["historial"] == [[h0, 500], [h1, 600]]
+
+
+def test_linea_incompleta_espera(tmp_path):
+    # Una última línea sin salto puede estar a medio escribir: no se toma hasta que se complete
+    ruta = str(tmp_path / "estacion.csv")
+    lineas = _lineas("2020-01-01", 120)
+    _escribir(ruta, lineas[:100])
+    datos.cargar_estacion(ruta)
+    _escribir(ruta, lineas[100:119] + [lineas[119][:10]], "a")
+    assert len(datos.cargar_estacion(ruta)) == 119
+    _escribir(ruta, [lineas[119][10:]], "a")
+    assert len(datos.cargar_estacion(ruta)) == 120
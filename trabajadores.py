@@ -0,0 +1,125 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from shiny import reactive
+
+import metricas
+from cache_render import cache
+
+# Las figuras se dibujan en un pool de procesos (el estado de pyplot no es seguro entre hilos)
+# para que una gráfica lenta no congele el ciclo de eventos de Shiny y, con él, al resto de
+# las sesiones. Con ECOVENT_TRABAJADORES=0 se dibuja en el mismo proceso.
+N_TRABAJADORES = int(os.environ.get("ECOVENT_TRABAJADORES", max(1, min(4, (os.cpu_count() or 2) - 1))))
+
+# Segundos que se espera a que todos los trabajadores estén corriendo
+ESPERA_ARRANQUE = 120
+
+_pool = None
+
+
+def _iniciar():
+    # Precargar matplotlib y seaborn en cada proceso antes del primer trabajo
+    import graficas
+    graficas.cargar()
+
+
+def _esperar(barrera):
+    # Cada trabajador se queda con uno de estos trabajos hasta que todos tienen el suyo
+    barrera.wait(ESPERA_ARRANQUE)
+    return os.getpid()
+
+
+def _dibujar(fn, *args):
+    # Corre en el trabajador: la imagen y los segundos de cada fase, que el proceso de la app
+    # registra en sus métricas (armar la figura y savefig, que rasteriza y codifica el PNG)
+    import graficas
+    graficas.tiempo_png = 0.0
+    t = time.perf_counter()
+    imagen = fn(*args)
+    total = time.perf_counter() - t
+    return imagen, {"figura": total - graficas.tiempo_png, "png": graficas.tiempo_png}
+
+
+def _registrar(grafica, fases):
+    metricas.contar("ecovent_dibujos_total", grafica=grafica)
+    for fase, segundos in fases.items():
+        metricas.observar("ecovent_dibujo_segundos", segundos, grafica=grafica, fase=fase)
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            N_TRABAJADORES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar,
+        )
+    return _pool
+
+
+def arrancar():
+    # Levanta los procesos (y con ellos matplotlib) antes de la primera gráfica. El pool arranca un
+    # proceso por trabajo enviado cuando no tiene alguno libre, así que se envían N trabajos que
+    # esperan en una barrera compartida: ninguno termina (ni deja libre a su proceso) hasta que
+    # los N procesos están corriendo y ya pasaron por _iniciar
+    if N_TRABAJADORES > 0:
+        with multiprocessing.get_context("spawn").Manager() as gestor:
+            barrera = gestor.Barrier(N_TRABAJADORES)
+            futuros = [pool().submit(_esperar, barrera) for _ in range(N_TRABAJADORES)]
+            for futuro in futuros:
+                futuro.result()
+
+
+def _guardar_al_terminar(clave, grafica):
+    # Aunque la sesión ya haya cancelado el trabajo, si el proceso llega a terminar
+    # la imagen se guarda en el cache para la siguiente vez que se pida
+    def guardar(futuro):
+        if not futuro.cancelled() and futuro.exception() is None:
+            imagen, fases = futuro.result()
+            cache.guardar(clave, imagen)
+            _registrar(grafica, fases)
+    return guardar
+
+
+def precalentar(clave, fn, *args):
+    # Dibuja en el pool, sin ninguna sesión esperando, una imagen que aún no está en cache;
+    # devuelve el futuro (None si ya estaba)
+    if cache.contiene(clave):
+        return None
+    futuro = pool().submit(_dibujar, fn, *args)
+    futuro.add_done_callback(_guardar_al_terminar(clave, fn.__name__))
+    return futuro
+
+
+async def dibujar(clave, fn, *args):
+    imagen = cache.obtener(clave)
+    if imagen is not None:
+        return imagen
+    t = time.perf_counter()
+    if N_TRABAJADORES == 0:
+        imagen, fases = _dibujar(fn, *args)
+        cache.guardar(clave, imagen)
+        _registrar(fn.__name__, fases)
+    else:
+        futuro = pool().submit(_dibujar, fn, *args)
+        futuro.add_done_callback(_guardar_al_terminar(clave, fn.__name__))
+        imagen, _ = await asyncio.wrap_future(futuro)
+    metricas.observar("ecovent_dibujo_espera_segundos", time.perf_counter() - t, grafica=fn.__name__)
+    return imagen
+
+
+class TareaGrafica:
+    # Una por salida y sesión: sólo interesa la petición más reciente, así que al pedir
+    # una imagen nueva se cancela la que esté en curso (o en cola) para la misma salida
+    def __init__(self):
+        self.tarea = reactive.ExtendedTask(dibujar)
+
+    def pedir(self, clave, fn, *args):
+        self.tarea.cancel()
+        self.tarea.invoke(clave, fn, *args)
+
+    def imagen(self):
+        return self.tarea.result()
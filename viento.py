@@ -0,0 +1,44 @@
+import numpy as np
+
+from climatologia import HORAS, MESES, claves
+
+# Histogramas de viento: cada registro se asigna a un sector de dirección y a una clase de
+# velocidad con np.digitize, y los conteos se acumulan con un solo np.bincount por
+# (mes, hora, sector, clase). Filtrar por meses y horas es entonces recortar y sumar el arreglo.
+SECTORES = 16
+ANCHO_SECTOR = 360 / SECTORES
+ETIQUETAS_SECTOR = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                    "S", "SSO", "SO", "OSO", "O", "ONO", "NO", "NNO"]
+# Límites de las clases de velocidad [m/s]; la primera clase son las calmas
+LIMITES_VELOCIDAD = np.array([0.5, 1, 2, 3, 4, 5])
+ETIQUETAS_VELOCIDAD = ["< 0.5", "0.5 - 1", "1 - 2", "2 - 3", "3 - 4", "4 - 5", "> 5"]
+CLASES = len(LIMITES_VELOCIDAD) + 1
+
+
+def sector(direccion):
+    # Sectores centrados en cada rumbo: el norte va de 348.75° a 11.25°
+    girada = (direccion + ANCHO_SECTOR / 2) % 360
+    return np.digitize(girada, np.arange(1, SECTORES) * ANCHO_SECTOR)
+
+
+def histogramas(df):
+    mes, _, hora = claves(df.index)
+    velocidad = df["WSpeed_Avg"].to_numpy(dtype="float64")
+    direccion = df["WDir_Avg"].to_numpy(dtype="float64")
+    validos = np.isfinite(velocidad) & np.isfinite(direccion)
+
+    celda = (mes * HORAS + hora)[validos] * SECTORES + sector(direccion[validos])
+    celda = celda * CLASES + np.digitize(velocidad[validos], LIMITES_VELOCIDAD)
+    conteos = np.bincount(celda, minlength=MESES * HORAS * SECTORES * CLASES)
+    return {"histograma": conteos.reshape(MESES, HORAS, SECTORES, CLASES)}
+
+
+def filtrar(viento, meses, horas):
+    # Conteos (sector x clase) de los meses y horas elegidos (rangos inclusivos, meses desde 1)
+    return viento["histograma"][meses[0] - 1:meses[1], horas[0]:horas[1] + 1].sum(axis=(0, 1))
+
+
+def frecuencias(conteos):
+    # Porcentaje de los registros en cada sector y clase de velocidad
+    total = conteos.sum()
+    return 100 * conteos / total if total > 0 else np.zeros(conteos.shape)
@@ -0,0 +1,90 @@
+from climatologia import tabla_mes
+from cuantiles import ESTADISTICOS
+from graficas import meses, ticks, grafica_heatmap, grafica_zona_confort
+
+# Vistas por defecto de una estación: las que ve una sesión nueva sin mover nada (todos los años,
+# promedios, horas 0-23, todos los meses, enero, sin ajuste a la zona de confort y el rango de
+# color de toda la estación). app.py arma sus controles y sus claves con las mismas definiciones
+# (HEATMAPS, rango, clave, titulo), así que las imágenes dibujadas de antemano se sirven desde
+# cache_render; como llevan la versión de los datos, dejan de usarse solas cuando la estación cambia.
+HORAS = (0, 23)
+MESES = (1, 12)
+DIAS = (1, 31)
+MES = "01"
+
+# Mapas de calor por tipo: tabla (mes x hora) de la que sale el rango de color inicial, paso del
+# slider de rango, delta por defecto de las marcas, etiqueta de la barra de color, título de los
+# promedios, y variable y periodo de los títulos de los percentiles
+HEATMAPS = {
+    "Heatmap_anual": {"tabla": "To", "paso": 0.01, "delta": 1, "etiqueta": "To [°C]",
+                      "titulo": "Temperatura promedios mensuales", "variable": "Temperatura", "por": "mes"},
+    "Heatmap_mensual": {"tabla": "To", "paso": 0.01, "delta": 1, "etiqueta": "To [°C]",
+                        "titulo": "Temperatura promedios diarios", "variable": "Temperatura", "por": "día"},
+    "Heatmap_anual_HR": {"tabla": "HR", "paso": 0.5, "delta": 10, "etiqueta": "HR [%]",
+                         "titulo": "Humedad relativa promedios mensuales", "variable": "Humedad relativa",
+                         "por": "mes"},
+    "Heatmap_mensual_HR": {"tabla": "HR", "paso": 0.5, "delta": 20, "etiqueta": "To [%]",
+                           "titulo": "Humedad relativa promedios diarios", "variable": "Humedad relativa",
+                           "por": "día"},
+}
+# (tabla, cubo, tipo anual, tipo mensual) de cada variable
+VARIABLES = (
+    ("To", "To_cubo", "Heatmap_anual", "Heatmap_mensual"),
+    ("HR", "HR_cubo", "Heatmap_anual_HR", "Heatmap_mensual_HR"),
+)
+
+
+def _deslizador(valor, paso):
+    # Valor que devuelve un slider de Shiny al recibir `valor`: ajustado a múltiplos del paso
+    return round(round(float(valor) / paso) * paso, 2)
+
+
+def rango(d, tipo):
+    # Rango de color inicial del mapa de calor `tipo`, tal como lo devuelve su slider
+    valores = d[HEATMAPS[tipo]["tabla"]].stack()
+    paso = HEATMAPS[tipo]["paso"]
+    return _deslizador(valores.min(), paso), _deslizador(valores.max(), paso)
+
+
+def clave(d, tipo, *corte):
+    # Clave en cache_render de una gráfica de la estación (o del rango de años) `d`
+    return (d["ruta"], d["version"], d["anios"], tipo) + corte
+
+
+def titulo(tipo, estadistico):
+    h = HEATMAPS[tipo]
+    if estadistico == "media":
+        return h["titulo"]
+    return f"{h['variable']}, {ESTADISTICOS[estadistico].lower()} por {h['por']}"
+
+
+def anuales(d):
+    # Zona de confort y mapas de calor mensuales (horas x meses) de temperatura y HR; cada vista
+    # es (clave, función, argumentos)
+    vistas = [(clave(d, "zona_confort"), grafica_zona_confort, (d["Zona_confort"],))]
+    for tabla, _, tipo, _ in VARIABLES:
+        desde, hasta = rango(d, tipo)
+        marcas = ticks(desde, hasta, HEATMAPS[tipo]["delta"])
+        matriz = d[tabla].set_axis(meses, axis=1).iloc[HORAS[0]:HORAS[1]+1, MESES[0]-1:MESES[1]]
+        vistas.append((clave(d, tipo, "media", HORAS, MESES, desde, hasta, marcas), grafica_heatmap,
+                       (matriz, desde, hasta, marcas, HEATMAPS[tipo]["etiqueta"], titulo(tipo, "media"), "Mes")))
+    return vistas
+
+
+def mensuales(d, mes):
+    # Mapas de calor diarios (horas x días) de temperatura y HR del mes ("01" a "12"); vacío si
+    # la estación no tiene datos de ese mes
+    if d["dias_mes"][int(mes)-1] == 0:
+        return []
+    vistas = []
+    for _, cubo, _, tipo in VARIABLES:
+        desde, hasta = rango(d, tipo)
+        marcas = ticks(desde, hasta, HEATMAPS[tipo]["delta"])
+        matriz = tabla_mes(d[cubo], d["dias_mes"], int(mes), HORAS, DIAS)
+        vistas.append((clave(d, tipo, "media", mes, HORAS, DIAS, desde, hasta, marcas), grafica_heatmap,
+                       (matriz, desde, hasta, marcas, HEATMAPS[tipo]["etiqueta"], titulo(tipo, "media"), "Mes")))
+    return vistas
+
+
+def por_defecto(d):
+    return anuales(d) + mensuales(d, MES)
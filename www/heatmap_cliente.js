@@ -0,0 +1,210 @@
+// Heatmaps dibujados en el navegador (modo "Interactivas en el navegador").
+// El servidor envía una sola vez por estación las matrices To, To_diario, HR y HR_diario
+// como Float32Array codificados en base64; a partir de ahí el recorte por horas, meses y días
+// y los límites de color se resuelven aquí, sin pedir imágenes al servidor.
+(function () {
+  var datos = null;
+  var entradas = {};
+
+  // Mapa de color "jet" de matplotlib (segmentos lineales)
+  var JET = {
+    r: [[0, 0], [0.35, 0], [0.66, 1], [0.89, 1], [1, 0.5]],
+    g: [[0, 0], [0.125, 0], [0.375, 1], [0.64, 1], [0.91, 0], [1, 0]],
+    b: [[0, 0.5], [0.11, 1], [0.34, 1], [0.65, 0], [1, 0]]
+  };
+
+  function segmento(puntos, t) {
+    for (var i = 1; i < puntos.length; i++) {
+      if (t <= puntos[i][0]) {
+        var a = puntos[i - 1], b = puntos[i];
+        return a[1] + (b[1] - a[1]) * (t - a[0]) / (b[0] - a[0]);
+      }
+    }
+    return puntos[puntos.length - 1][1];
+  }
+
+  function jet(t) {
+    t = Math.min(1, Math.max(0, t));
+    return "rgb(" + Math.round(255 * segmento(JET.r, t)) + "," +
+      Math.round(255 * segmento(JET.g, t)) + "," +
+      Math.round(255 * segmento(JET.b, t)) + ")";
+  }
+
+  function decodificar(matriz) {
+    var binario = atob(matriz.valores);
+    var bytes = new Uint8Array(binario.length);
+    for (var i = 0; i < binario.length; i++) bytes[i] = binario.charCodeAt(i);
+    matriz.valores = new Float32Array(bytes.buffer);
+    return matriz;
+  }
+
+  function entrada(id) {
+    if (id in entradas) return entradas[id];
+    var valores = Shiny.shinyapp.$inputValues;
+    for (var clave in valores) {
+      if (clave.split(":")[0] === id) return valores[clave];
+    }
+    return null;
+  }
+
+  function rango(desde, hasta) {
+    var r = [];
+    for (var i = desde; i < hasta; i++) r.push(i);
+    return r;
+  }
+
+  function seleccion(c, matriz) {
+    var horas = entrada(c.horas) || [0, 23];
+    var filas = rango(Math.max(0, horas[0]), Math.min(matriz.filas.length, horas[1] + 1));
+    var periodo = entrada(c.periodo) || [1, matriz.columnas.length];
+    var columnas;
+    var mes = null;
+    if (c.mes) {
+      // Columnas "MM-DD" del mes elegido cuyo día cae en el rango de días, como tabla_mes del
+      // servidor: el día sale de la etiqueta, no de la posición de la columna
+      mes = entrada(c.mes);
+      columnas = [];
+      matriz.columnas.forEach(function (col, j) {
+        var dia = parseInt(col.slice(3), 10);
+        if (col.indexOf(mes + "-") === 0 && dia >= periodo[0] && dia <= periodo[1]) columnas.push(j);
+      });
+    } else {
+      columnas = rango(Math.max(0, periodo[0] - 1), Math.min(matriz.columnas.length, periodo[1]));
+    }
+    return { filas: filas, columnas: columnas, periodo: periodo, mes: mes };
+  }
+
+  // Meses sin datos en el rango de años elegido
+  function conDatos(v) {
+    return v !== null;
+  }
+
+  function limites(c, sel) {
+    if (entrada(c.ajuste) === "Si") {
+      if (c.limites === "hr") return [20, 60];
+      if (sel.mes) {
+        // Límites diarios de los días mostrados
+        var infDia = sel.columnas.map(function (j) { return datos.lim_inf_dia[j]; }).filter(conDatos);
+        var supDia = sel.columnas.map(function (j) { return datos.lim_sup_dia[j]; }).filter(conDatos);
+        return [Math.min.apply(null, infDia), Math.max.apply(null, supDia)];
+      }
+      var inf = datos.lim_inf.slice(sel.periodo[0] - 1, sel.periodo[1]).filter(conDatos);
+      var sup = datos.lim_sup.slice(sel.periodo[0] - 1, sel.periodo[1]).filter(conDatos);
+      return [Math.min.apply(null, inf), Math.max.apply(null, sup)];
+    }
+    return entrada(c.rango);
+  }
+
+  function ticks(desde, hasta, delta) {
+    var t = [desde];
+    if (delta > 0) {
+      for (var v = desde; v < hasta; v += delta) t.push(v);
+    }
+    t.push(hasta);
+    return t.map(function (v) { return Math.round(v * 10) / 10; });
+  }
+
+  function dibujar(canvas) {
+    if (!datos || !window.Shiny || !Shiny.shinyapp) return;
+    var c = canvas.dataset;
+    var matriz = datos.matrices[c.matriz];
+    var sel = seleccion(c, matriz);
+    var lim = limites(c, sel);
+    if (!lim) return;
+    var desde = lim[0], hasta = lim[1];
+
+    var escala = window.devicePixelRatio || 1;
+    var ancho = canvas.clientWidth, alto = Math.round(ancho * 0.6);
+    canvas.style.height = alto + "px";
+    canvas.width = ancho * escala;
+    canvas.height = alto * escala;
+    var ctx = canvas.getContext("2d");
+    ctx.setTransform(escala, 0, 0, escala, 0, 0);
+    ctx.clearRect(0, 0, ancho, alto);
+
+    var izq = 60, der = 90, arriba = 30, abajo = 50;
+    var w = ancho - izq - der, h = alto - arriba - abajo;
+    var n = sel.filas.length, m = sel.columnas.length;
+    if (w <= 0 || h <= 0 || n === 0 || m === 0) return;
+    var cw = w / m, ch = h / n;
+    var total = matriz.columnas.length;
+
+    sel.filas.forEach(function (fila, i) {
+      sel.columnas.forEach(function (col, j) {
+        var v = matriz.valores[fila * total + col];
+        ctx.fillStyle = isNaN(v) ? "#ffffff" : jet((v - desde) / (hasta - desde));
+        ctx.fillRect(izq + j * cw, arriba + i * ch, Math.ceil(cw), Math.ceil(ch));
+      });
+    });
+
+    ctx.fillStyle = "#000";
+    ctx.font = "10px sans-serif";
+    ctx.textAlign = "right";
+    ctx.textBaseline = "middle";
+    sel.filas.forEach(function (fila, i) {
+      ctx.fillText(matriz.filas[fila], izq - 4, arriba + (i + 0.5) * ch);
+    });
+    ctx.textAlign = "center";
+    ctx.textBaseline = "top";
+    var paso = Math.max(1, Math.ceil(m / 16));
+    sel.columnas.forEach(function (col, j) {
+      if (j % paso === 0) ctx.fillText(matriz.columnas[col], izq + (j + 0.5) * cw, arriba + h + 4);
+    });
+    ctx.font = "bold 12px sans-serif";
+    ctx.fillText(c.titulo, izq + w / 2, 8);
+    ctx.font = "11px sans-serif";
+    ctx.fillText(c.ejeX, izq + w / 2, alto - 16);
+    ctx.save();
+    ctx.translate(14, arriba + h / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.fillText("Tiempo [h]", 0, -6);
+    ctx.restore();
+
+    // Barra de color con los mismos ticks que la versión del servidor
+    var bx = izq + w + 15, bw = 15;
+    for (var k = 0; k < h; k++) {
+      ctx.fillStyle = jet(1 - k / h);
+      ctx.fillRect(bx, arriba + k, bw, 1);
+    }
+    ctx.fillStyle = "#000";
+    ctx.font = "10px sans-serif";
+    ctx.textAlign = "left";
+    ctx.textBaseline = "middle";
+    ticks(desde, hasta, entrada(c.delta)).forEach(function (t) {
+      var y = arriba + h * (1 - (t - desde) / (hasta - desde));
+      ctx.fillRect(bx + bw, y, 3, 1);
+      ctx.fillText(t, bx + bw + 5, y);
+    });
+    ctx.save();
+    ctx.translate(bx + bw + 50, arriba + h / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.textAlign = "center";
+    ctx.fillText(c.etiqueta, 0, 0);
+    ctx.restore();
+  }
+
+  function dibujarTodos() {
+    document.querySelectorAll("canvas.ecovent-heatmap").forEach(function (canvas) {
+      if (canvas.offsetParent !== null) dibujar(canvas);
+    });
+  }
+
+  $(document).on("shiny:connected", function () {
+    Shiny.addCustomMessageHandler("ecovent_matrices", function (mensaje) {
+      Object.keys(mensaje.matrices).forEach(function (nombre) {
+        decodificar(mensaje.matrices[nombre]);
+      });
+      datos = mensaje;
+      dibujarTodos();
+    });
+  });
+
+  $(document).on("shiny:inputchanged", function (evento) {
+    entradas[evento.name] = evento.value;
+    window.requestAnimationFrame(dibujarTodos);
+  });
+
+  // Al cambiar de pestaña o de tamaño los canvas visibles cambian de ancho
+  $(document).on("shown.bs.tab", dibujarTodos);
+  $(window).on("resize", dibujarTodos);
+})();